@@ -0,0 +1,207 @@
+"""
+Admission Control for Lookate API
+Cost classes, concurrency limits and per-user rate limits for expensive routes
+
+Every endpoint belongs to a cost class. A class may cap how many of its
+requests run at once in a process. Requests over the cap wait in a
+bounded FIFO queue, and are rejected at once (503 + Retry-After) when
+the queue is full or when the expected wait, estimated from the recent
+service time, would pass the class's deadline. A queued request that
+is still waiting at the deadline is rejected too. Classes without a cap
+(cheap reads) never wait behind the AI routes.
+
+Per-user token buckets (429 + Retry-After) bound how fast one user can
+spend each class. With Redis the buckets are shared by every worker (one
+Lua script call per check); otherwise each process keeps its own.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from cache import LRUBackend, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = 'rate_limited'
+QUEUE_FULL = 'queue_full'
+DEADLINE = 'deadline'
+
+# Refill, spend one token and report the wait for the next one, atomically; Redis TIME keeps workers on one clock
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+
+
+class CostClass:
+    """Limits for one class of endpoints; 0 disables a limit"""
+
+    def __init__(self, name, concurrency=0, queue_size=0, max_wait=2.0, rate_per_minute=0, burst=0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst or max(1, rate_per_minute)
+
+
+class ConcurrencyLimiter:
+    """Per-process cap on running requests with a bounded, deadline-aware wait queue"""
+
+    def __init__(self, limit, queue_size, max_wait):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.service_time = None  # moving average of seconds per request
+        self._condition = threading.Condition()
+
+    def expected_wait(self, position):
+        """Seconds until a request at this queue position should start running"""
+        if self.service_time is None:
+            return 0.0
+        return position * self.service_time / self.limit
+
+    def acquire(self):
+        with self._condition:
+            # Newcomers queue behind existing waiters instead of taking a freed slot first
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return
+            if self.waiting >= self.queue_size:
+                raise AdmissionRejected('Server is busy, try again shortly', 503,
+                                        self.expected_wait(self.waiting + 1) or self.max_wait, QUEUE_FULL)
+            expected = self.expected_wait(self.waiting + 1)
+            if expected > self.max_wait:
+                raise AdmissionRejected('Server is busy, try again shortly', 503, expected, DEADLINE)
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise AdmissionRejected('Server is busy, try again shortly', 503,
+                                                self.expected_wait(self.waiting) or self.max_wait, DEADLINE)
+                    self._condition.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, elapsed):
+        with self._condition:
+            self.active -= 1
+            if self.service_time is None:
+                self.service_time = elapsed
+            else:
+                self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+            self._condition.notify()
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets in Redis when available, else in this process
+
+    Redis errors fall back to the local buckets, so a Redis outage loosens
+    the limits to per-process instead of rejecting traffic.
+    """
+
+    def __init__(self, client=None, prefix='lookate:rate:', max_keys=100000):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT) if client is not None else None
+        self._buckets = LRUBackend(max_entries=max_keys)
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst):
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        if self._script is not None:
+            try:
+                return float(self._script(keys=[self.prefix + key], args=[rate, burst]))
+            except Exception as e:
+                logger.warning("Redis rate limit check failed, using local buckets: %s", e)
+        return self._consume_local(key, rate, burst)
+
+    def _consume_local(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key) or (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets.set(key, (tokens, now), ttl=burst / rate + 1)
+            return wait
+
+
+class AdmissionController:
+    """Admit or shed requests by cost class and caller"""
+
+    def __init__(self, classes, rate_limiter, enabled=True):
+        self.classes = {cost_class.name: cost_class for cost_class in classes}
+        self.rate_limiter = rate_limiter
+        self.enabled = enabled
+        self._limiters = {
+            cost_class.name: ConcurrencyLimiter(cost_class.concurrency, cost_class.queue_size, cost_class.max_wait)
+            for cost_class in classes if cost_class.concurrency
+        }
+
+    def admit(self, class_name, caller):
+        """Wait for a slot; returns a ticket for release() or raises AdmissionRejected"""
+        if not self.enabled:
+            return None
+        cost_class = self.classes[class_name]
+        if cost_class.rate:
+            wait = self.rate_limiter.consume(f'{class_name}:{caller}', cost_class.rate, cost_class.burst)
+            if wait > 0:
+                raise AdmissionRejected('Rate limit exceeded, slow down', 429, wait, RATE_LIMITED)
+        limiter = self._limiters.get(class_name)
+        if limiter is None:
+            return None
+        limiter.acquire()
+        return (limiter, time.monotonic())
+
+    def release(self, ticket):
+        if ticket is not None:
+            limiter, started = ticket
+            limiter.release(time.monotonic() - started)
+
+    def stats(self):
+        return {
+            name: {'active': limiter.active, 'waiting': limiter.waiting, 'limit': limiter.limit}
+            for name, limiter in self._limiters.items()
+        }
+
+
+def create_rate_limiter(redis_url=None):
+    """Share buckets through Redis when reachable, else keep them in-process"""
+    return TokenBucketLimiter(get_redis_client(redis_url))
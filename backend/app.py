@@ -19,35 +19,138 @@ Technology Stack:
 - Redis (Caching & Sessions)
 """
 
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-import openai
-import requests
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.exc import IntegrityError
+from flask_jwt_extended import (JWTManager, jwt_required, create_access_token, get_jwt_identity,
+                                verify_jwt_in_request)
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import datetime, timezone
 import base64
+import json
 import os
-from PIL import Image
-import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cache import create_cache, make_cache_key, normalize_query
+from background import BackgroundPool
+from spatial import covering_cells, geohash_encode, haversine_m
+from places import PlacesTileCache
+from suggest import QuerySuggester
+from admission import AdmissionController, AdmissionRejected, CostClass, create_rate_limiter
+from upstream import UpstreamClient, UpstreamError
+from conversation import ConversationStore
+import migrations
+import history
+from imaging import (ImageAnalysisCache, InvalidImageError, UploadTooLargeError, decode_image, dhash,
+                     preprocess_image, spool_stream)
+from audio import content_hash, split_on_silence
+from writebehind import IdAllocator, WriteBehindQueue, create_queue_backend
+from metrics import Metrics
+from passwords import PasswordHasher, PasswordHasherBusyError
+import serving
+from config import config
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///lookate.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
+# Initialize extensions; they are bound to an application in create_app()
+db = SQLAlchemy()
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
 
-# Initialize extensions
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+# Prometheus metrics (served at /metrics), with per-request SQL and upstream timing
+metrics = Metrics()
+metrics.instrument_sqlalchemy()
+admission_rejections = metrics.counter(
+    'lookate_admission_rejected_total', 'Requests shed by admission control', ('cost_class', 'reason'))
 
-# OpenAI Configuration
-openai.api_key = os.environ.get('OPENAI_API_KEY', 'your-openai-api-key')
+# OpenAI Configuration (the SDK is imported on first use, see get_openai)
+OPENAI_API_KEY = None
+OPENAI_API_BASE = 'https://api.openai.com/v1'
+_openai = None
+_openai_lock = threading.Lock()
 
-# Google Maps API Key
-GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', 'your-google-maps-api-key')
+def get_openai():
+    """The configured openai module; importing the SDK costs ~0.5s, so it happens on first use or in warmup()"""
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                import openai
+                openai.api_key = OPENAI_API_KEY
+                openai.api_base = OPENAI_API_BASE
+                serving.configure_openai(openai)
+                _openai = openai
+    return _openai
+
+# Google Maps API
+GOOGLE_MAPS_API_KEY = None
+GOOGLE_MAPS_BASE_URL = 'https://maps.googleapis.com'
+
+TEXT_SEARCH_MODEL = "gpt-3.5-turbo"
+TEXT_SEARCH_TEMPERATURE = 0.7
+TEXT_SEARCH_MAX_TOKENS = 500
+TEXT_SEARCH_SYSTEM_PROMPT = "You are a helpful AI assistant for Lookate, an AI-powered discovery app. Provide accurate, helpful responses about the user's query."
+
+TRANSCRIBE_MODEL = "whisper-1"
+
+IMAGE_SEARCH_MODEL = "gpt-4-vision-preview"
+IMAGE_SEARCH_MAX_TOKENS = 500
+
+CHAT_MODEL = "gpt-3.5-turbo"
+CHAT_TEMPERATURE = 0.8
+CHAT_MAX_TOKENS = 400
+CHAT_SYSTEM_PROMPT = "You are Lookate's AI assistant. Help users with discovery, task management, and location-based queries. Be helpful, concise, and engaging."
+CHAT_SUMMARY_PROMPT = "Summarize this conversation between a user and Lookate's AI assistant. Keep facts, preferences, places and open tasks the assistant may need later. Be brief."
+
+# Admission cost classes: uploads to vision/Whisper, other OpenAI calls, everything else.
+# /batch itself is standard; each sub-request is admitted under its own endpoint's class.
+ENDPOINT_COST_CLASSES = {
+    'api.image_search': 'heavy',
+    'api.voice_search': 'heavy',
+    'api.text_search': 'ai',
+    'api.chat_with_ai': 'ai',
+    'api.chat_with_ai_stream': 'ai'
+}
+DEFAULT_COST_CLASS = 'standard'
+AUTH_ENDPOINTS = {'api.register', 'api.login'}
+
+# Search types whose queries feed /search/suggest (image prompts are mostly empty)
+SUGGEST_SEARCH_TYPES = ('text', 'voice')
+
+GEOCODE_PENDING = 'pending'
+GEOCODE_RESOLVED = 'resolved'
+GEOCODE_FAILED = 'failed'
+GEOCODE_RETRY_MAX_SECONDS = 3600
+
+# JWT-protected JSON endpoints that /batch may dispatch to
+BATCHABLE_ENDPOINTS = {
+    'api.text_search',
+    'api.chat_with_ai',
+    'api.get_tasks',
+    'api.sync_tasks',
+    'api.get_nearby_tasks',
+    'api.create_task',
+    'api.toggle_task',
+    'api.create_tasks_bulk',
+    'api.toggle_tasks_bulk',
+    'api.get_nearby_locations',
+    'api.get_user_profile',
+    'api.search_history',
+    'api.suggest_searches'
+}
+
+# flask_jwt_extended request state carried from /batch into its sub-requests
+JWT_CONTEXT_ATTRS = (
+    '_jwt_extended_jwt',
+    '_jwt_extended_jwt_header',
+    '_jwt_extended_jwt_user',
+    '_jwt_extended_jwt_location'
+)
+
+# Striped locks so concurrent workers resolving the same address make one upstream call
+_geocode_locks = [threading.Lock() for _ in range(64)]
+
+# Caches, pools and upstream clients are created per application by init_services()
 
 # Database Models
 class User(db.Model):
@@ -66,6 +169,11 @@ class Search(db.Model):
     search_type = db.Column(db.String(50), nullable=False)  # text, image, voice
     result = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_search_user_created', 'user_id', 'created_at'),
+        db.Index('ix_search_created', 'created_at'),
+    )
 
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,7 +185,33 @@ class Task(db.Model):
     location = db.Column(db.String(200))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geocode_status = db.Column(db.String(20))  # pending, resolved, failed
+    geohash = db.Column(db.String(12))
+    version = db.Column(db.Integer, nullable=False, default=0)  # per-user sync version of the last write
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_task_user_geohash', 'user_id', 'geohash'),
+        db.Index('ix_task_user_created', 'user_id', 'created_at'),
+        db.Index('ix_task_user_completed', 'user_id', 'completed'),
+        db.Index('ix_task_user_version', 'user_id', 'version'),
+    )
+
+class GeocodeCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    address = db.Column(db.String(200), unique=True, nullable=False)  # normalized location text
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    searches = db.Column(db.Integer, nullable=False, default=0)
+    tasks_total = db.Column(db.Integer, nullable=False, default=0)
+    tasks_completed = db.Column(db.Integer, nullable=False, default=0)
+    tasks_version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -85,9 +219,23 @@ class ChatMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_chat_message_user_created', 'user_id', 'created_at'),
+    )
+
+class ChatSummary(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False)
+    through = db.Column(db.Float, nullable=False)  # epoch time of the last chat message folded in
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IdAllocation(db.Model):
+    name = db.Column(db.String(50), primary_key=True)  # table whose IDs are pre-assigned
+    next_value = db.Column(db.BigInteger, nullable=False)
 
 # Authentication Routes
-@app.route('/auth/register', methods=['POST'])
+@api.route('/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -104,10 +252,12 @@ def register():
         user = User(
             email=data['email'],
             name=data['name'],
-            password_hash=generate_password_hash(data['password'])
+            password_hash=password_hasher.hash(data['password'])
         )
         
         db.session.add(user)
+        db.session.flush()
+        db.session.add(UserStats(user_id=user.id))
         db.session.commit()
         
         # Create access token
@@ -123,10 +273,12 @@ def register():
             }
         }), 201
         
+    except PasswordHasherBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/auth/login', methods=['POST'])
+@api.route('/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -136,7 +288,9 @@ def login():
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if user and check_password_hash(user.password_hash, data['password']):
+        if user and password_hasher.verify(user.password_hash, data['password']):
+            if password_hasher.needs_rehash(user.password_hash):
+                password_rehash_pool.submit(rehash_password, user.id, user.password_hash, data['password'])
             access_token = create_access_token(identity=user.id)
             return jsonify({
                 'message': 'Login successful',
@@ -150,11 +304,13 @@ def login():
         
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except PasswordHasherBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Multimodal Search Routes
-@app.route('/search/text', methods=['POST'])
+@api.route('/search/text', methods=['POST'])
 @jwt_required()
 def text_search():
     try:
@@ -165,88 +321,108 @@ def text_search():
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        # Use OpenAI for intelligent search
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant for Lookate, an AI-powered discovery app. Provide accurate, helpful responses about the user's query."},
-                {"role": "user", "content": query}
-            ],
-            max_tokens=500,
-            temperature=0.7
+        # Serve repeated queries from the response cache
+        cache_key = make_cache_key(
+            'search:text',
+            normalize_query(query),
+            TEXT_SEARCH_MODEL,
+            TEXT_SEARCH_TEMPERATURE,
+            TEXT_SEARCH_MAX_TOKENS,
+            TEXT_SEARCH_SYSTEM_PROMPT
         )
-        
-        result = response.choices[0].message.content
-        
-        # Save search to database
-        search = Search(
-            user_id=user_id,
-            query=query,
-            search_type='text',
-            result=result
-        )
-        db.session.add(search)
-        db.session.commit()
+        result = search_cache.get(cache_key)
+        cached = result is not None
+        
+        if not cached:
+            # Use OpenAI for intelligent search
+            with metrics.track_upstream('openai_chat'):
+                response = get_openai().ChatCompletion.create(
+                    model=TEXT_SEARCH_MODEL,
+                    messages=[
+                        {"role": "system", "content": TEXT_SEARCH_SYSTEM_PROMPT},
+                        {"role": "user", "content": query}
+                    ],
+                    max_tokens=TEXT_SEARCH_MAX_TOKENS,
+                    temperature=TEXT_SEARCH_TEMPERATURE
+                )
+            
+            result = response.choices[0].message.content
+            search_cache.set(cache_key, result)
+        
+        # Save search to database (also on cache hits so profile stats stay correct)
+        search_id = log_search(user_id, query, 'text', result)
         
         return jsonify({
             'result': result,
-            'search_id': search.id,
-            'suggestions': generate_suggestions(query)
+            'search_id': search_id,
+            'suggestions': [s['text'] for s in query_suggester.suggest(user_id, query, limit=4)
+                            if s['text'] != normalize_query(query)][:3],
+            'cached': cached
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/search/image', methods=['POST'])
+@api.route('/search/suggest', methods=['GET'])
+@jwt_required()
+def suggest_searches():
+    try:
+        user_id = get_jwt_identity()
+        prefix = request.args.get('prefix', '')
+        if not prefix.strip():
+            return jsonify({'error': 'prefix is required'}), 400
+        limit = max(1, min(request.args.get('limit', 5, type=int), 10))
+        
+        response = jsonify({'suggestions': query_suggester.suggest(user_id, prefix, limit)})
+        # Per-keystroke lookups: let the client reuse answers for repeated prefixes briefly
+        response.headers['Cache-Control'] = 'private, max-age=60'
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/search/image', methods=['POST'])
 @jwt_required()
 def image_search():
     try:
+        user_id = get_jwt_identity()
+        
+        # Multipart upload: werkzeug has already spooled the file part to a temp file
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image')
+            if not upload:
+                return jsonify({'error': 'Image file is required'}), 400
+            return run_image_search(user_id, upload.stream, request.form.get('query', ''))
+        
+        # Raw binary body (image/jpeg, image/png, application/octet-stream): stream it to a spooled file
+        if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+            with spool_stream(request.stream, current_app.config['MAX_CONTENT_LENGTH']) as upload:
+                return run_image_search(user_id, upload, request.args.get('query', ''))
+        
         data = request.get_json()
         image_data = data.get('image')  # Base64 encoded image
         query = data.get('query', '')
-        user_id = get_jwt_identity()
         
         if not image_data:
             return jsonify({'error': 'Image data is required'}), 400
         
-        # Process image with OpenAI Vision API
-        response = openai.ChatCompletion.create(
-            model="gpt-4-vision-preview",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": f"Analyze this image and provide detailed information. User query: {query}"},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}}
-                    ]
-                }
-            ],
-            max_tokens=500
-        )
+        if image_data.startswith('data:'):
+            image_data = image_data.split(',', 1)[-1]
+        try:
+            image_bytes = base64.b64decode(image_data)
+        except ValueError:
+            return jsonify({'error': 'Invalid image data'}), 400
         
-        result = response.choices[0].message.content
-        
-        # Save search to database
-        search = Search(
-            user_id=user_id,
-            query=f"Image search: {query}" if query else "Image identification",
-            search_type='image',
-            result=result
-        )
-        db.session.add(search)
-        db.session.commit()
-        
-        return jsonify({
-            'result': result,
-            'search_id': search.id,
-            'confidence': 0.85,  # Mock confidence score
-            'objects_detected': extract_objects(result)
-        }), 200
+        return run_image_search(user_id, image_bytes, query)
         
+    except InvalidImageError as e:
+        return jsonify({'error': str(e)}), 400
+    except (UploadTooLargeError, RequestEntityTooLarge):
+        return jsonify({'error': 'Image exceeds the maximum upload size'}), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/search/voice', methods=['POST'])
+@api.route('/search/voice', methods=['POST'])
 @jwt_required()
 def voice_search():
     try:
@@ -257,44 +433,41 @@ def voice_search():
         if not audio_file:
             return jsonify({'error': 'Audio file is required'}), 400
         
-        # Transcribe audio using OpenAI Whisper
-        transcript = openai.Audio.transcribe("whisper-1", audio_file)
-        query = transcript['text']
+        # Transcribe audio using OpenAI Whisper; retried uploads hit the transcript cache
+        cache_key = make_cache_key('transcript', content_hash(audio_file.stream), TRANSCRIBE_MODEL)
+        query = transcript_cache.get(cache_key)
+        if query is None:
+            query = transcribe_audio(audio_file)
+            transcript_cache.set(cache_key, query)
         
         # Process the transcribed query
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant for voice queries. Provide concise, accurate responses."},
-                {"role": "user", "content": query}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
+        with metrics.track_upstream('openai_chat'):
+            response = get_openai().ChatCompletion.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a helpful AI assistant for voice queries. Provide concise, accurate responses."},
+                    {"role": "user", "content": query}
+                ],
+                max_tokens=300,
+                temperature=0.7
+            )
         
         result = response.choices[0].message.content
         
         # Save search to database
-        search = Search(
-            user_id=user_id,
-            query=query,
-            search_type='voice',
-            result=result
-        )
-        db.session.add(search)
-        db.session.commit()
+        search_id = log_search(user_id, query, 'voice', result)
         
         return jsonify({
             'transcript': query,
             'result': result,
-            'search_id': search.id
+            'search_id': search_id
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # AI Chat Routes
-@app.route('/chat', methods=['POST'])
+@api.route('/chat', methods=['POST'])
 @jwt_required()
 def chat_with_ai():
     try:
@@ -305,101 +478,314 @@ def chat_with_ai():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Get conversation history
-        recent_messages = ChatMessage.query.filter_by(user_id=user_id)\
-                                         .order_by(ChatMessage.created_at.desc())\
-                                         .limit(5).all()
-        
-        # Build context for AI
-        context_messages = [
-            {"role": "system", "content": "You are Lookate's AI assistant. Help users with discovery, task management, and location-based queries. Be helpful, concise, and engaging."}
-        ]
-        
-        for msg in reversed(recent_messages):
-            context_messages.append({"role": "user", "content": msg.message})
-            context_messages.append({"role": "assistant", "content": msg.response})
-        
-        context_messages.append({"role": "user", "content": message})
+        # Build context for AI from conversation history
+        context_messages = build_chat_context(user_id, message)
         
         # Get AI response
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=context_messages,
-            max_tokens=400,
-            temperature=0.8
-        )
+        with metrics.track_upstream('openai_chat'):
+            response = get_openai().ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=context_messages,
+                max_tokens=CHAT_MAX_TOKENS,
+                temperature=CHAT_TEMPERATURE
+            )
         
         ai_response = response.choices[0].message.content
         
         # Save chat message
-        chat_message = ChatMessage(
-            user_id=user_id,
-            message=message,
-            response=ai_response
-        )
-        db.session.add(chat_message)
-        db.session.commit()
+        created_at = datetime.utcnow()
+        message_id = log_chat_message(user_id, message, ai_response, created_at)
+        record_chat_turn(user_id, message, ai_response, created_at)
         
         return jsonify({
             'response': ai_response,
-            'message_id': chat_message.id
+            'message_id': message_id
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/chat/stream', methods=['POST'])
+@jwt_required()
+def chat_with_ai_stream():
+    try:
+        data = request.get_json()
+        message = data.get('message', '')
+        user_id = get_jwt_identity()
+        
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        context_messages = build_chat_context(user_id, message)
+        
+        # Open the stream before responding so upstream errors still map to a 500
+        with metrics.track_upstream('openai_chat'):
+            chunks = get_openai().ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=context_messages,
+                max_tokens=CHAT_MAX_TOKENS,
+                temperature=CHAT_TEMPERATURE,
+                stream=True
+            )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        parts = []
+        completed = False
+        try:
+            for chunk in chunks:
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    parts.append(delta)
+                    yield sse_event({'delta': delta})
+            completed = True
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+        finally:
+            # Runs on completion and when the client disconnects mid-stream
+            message_id = None
+            if parts:
+                created_at = datetime.utcnow()
+                message_id = log_chat_message(user_id, message, ''.join(parts), created_at)
+                record_chat_turn(user_id, message, ''.join(parts), created_at)
+        if completed:
+            yield sse_event({'message_id': message_id}, event='done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Batch Route
+@api.route('/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    try:
+        data = request.get_json()
+        items = data.get('requests') if data else None
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'requests must be a non-empty list'}), 400
+        if len(items) > current_app.config['BATCH_MAX_REQUESTS']:
+            return jsonify({'error': f"At most {current_app.config['BATCH_MAX_REQUESTS']} requests per batch"}), 400
+        
+        # The token was verified once by jwt_required; sub-requests reuse the decoded claims
+        app = current_app._get_current_object()
+        jwt_context = {attr: getattr(g, attr) for attr in JWT_CONTEXT_ATTRS if hasattr(g, attr)}
+        caller = rate_limit_caller()
+        
+        # GETs are independent and run concurrently; each write runs alone, in order
+        results = [None] * len(items)
+        pending_reads = []
+        for index, item in enumerate(items):
+            method = str(item.get('method', 'GET')).upper() if isinstance(item, dict) else 'GET'
+            if method == 'GET':
+                pending_reads.append((index, batch_pool.submit(dispatch_batch_item, app, item, jwt_context, caller)))
+                continue
+            for read_index, future in pending_reads:
+                results[read_index] = future.result()
+            pending_reads = []
+            results[index] = batch_pool.submit(dispatch_batch_item, app, item, jwt_context, caller).result()
+        for read_index, future in pending_reads:
+            results[read_index] = future.result()
+        
+        for item, result in zip(items, results):
+            if isinstance(item, dict) and 'id' in item:
+                result['id'] = item['id']
+        
+        return jsonify({'responses': results}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# History Routes
+@api.route('/history/search', methods=['GET'])
+@jwt_required()
+def search_history():
+    try:
+        user_id = get_jwt_identity()
+        terms = history.parse_terms(request.args.get('q'))
+        if not terms:
+            return jsonify({'error': 'q is required'}), 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after = history.decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        index = history.get_history_index(db.engine)
+        if index is None or not index.ready(db.engine):
+            return jsonify({'error': 'History search is not available on this database'}), 501
+        
+        hits = index.search(db.session, user_id, terms, limit + 1, after)
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        
+        return jsonify({
+            'results': [{
+                'type': hit['type'],
+                'id': hit['id'],
+                'prompt': hit['prompt'],
+                'snippet': hit['snippet'],
+                'created_at': hit['created_at'].isoformat()
+            } for hit in hits],
+            'next_cursor': history.encode_cursor(hits[-1]['score'], hits[-1]['key']) if has_more else None
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Task Management Routes
-@app.route('/tasks', methods=['GET'])
+@api.route('/tasks', methods=['GET'])
 @jwt_required()
 def get_tasks():
     try:
         user_id = get_jwt_identity()
-        tasks = Task.query.filter_by(user_id=user_id).all()
+        limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+        cursor = request.args.get('cursor')
+        
+        # Any task write advances tasks_version, so it identifies every page of the list
+        version = get_tasks_version(user_id)
+        etag = f"tasks-{user_id}-{version}-{limit}-{cursor or ''}"
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        
+        query = Task.query.filter_by(user_id=user_id)
+        if cursor:
+            try:
+                created_at, task_id = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(db.or_(
+                Task.created_at > created_at,
+                db.and_(Task.created_at == created_at, Task.id > task_id)
+            ))
+        tasks = query.order_by(Task.created_at, Task.id).limit(limit + 1).all()
+        
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        
+        response = jsonify({
+            'tasks': [serialize_task(task) for task in tasks],
+            'next_cursor': encode_cursor(tasks[-1].created_at, tasks[-1].id) if has_more else None,
+            'version': version
+        })
+        return cacheable(response, etag), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks/sync', methods=['GET'])
+@jwt_required()
+def sync_tasks():
+    try:
+        user_id = get_jwt_identity()
+        since = request.args.get('since', 0, type=int)
+        limit = max(1, min(request.args.get('limit', 200, type=int), 1000))
+        
+        version = get_tasks_version(user_id)
+        etag = f"tasks-sync-{user_id}-{version}-{since}-{limit}"
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        
+        # Tasks created, updated or toggled after the client's version, oldest change first
+        tasks = Task.query.filter(Task.user_id == user_id, Task.version > since)\
+                          .order_by(Task.version)\
+                          .limit(limit + 1).all()
+        
+        has_more = len(tasks) > limit
+        tasks = tasks[:limit]
+        
+        response = jsonify({
+            'tasks': [serialize_task(task) for task in tasks],
+            'version': tasks[-1].version if has_more else version,
+            'has_more': has_more
+        })
+        return cacheable(response, etag), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks/nearby', methods=['GET'])
+@jwt_required()
+def get_nearby_tasks():
+    try:
+        user_id = get_jwt_identity()
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        radius = request.args.get('radius', 1000, type=float)  # meters
+        
+        if latitude is None or longitude is None:
+            return jsonify({'error': 'lat and lng are required'}), 400
+        if radius <= 0 or radius > 50000:
+            return jsonify({'error': 'radius must be between 0 and 50000 meters'}), 400
+        
+        # Prefilter with index range scans over the covering geohash cells
+        cell_filters = [
+            db.and_(Task.geohash >= cell, Task.geohash < cell + '~')
+            for cell in covering_cells(latitude, longitude, radius)
+        ]
+        query = Task.query.filter(Task.user_id == user_id, db.or_(*cell_filters))
+        completed = request.args.get('completed')
+        if completed is not None:
+            query = query.filter(Task.completed == (completed.lower() == 'true'))
+        candidates = query.all()
+        
+        if not candidates:
+            return jsonify({'tasks': []}), 200
+        
+        # Exact haversine filtering and distance ordering over the candidates
+        distances = haversine_m(
+            latitude,
+            longitude,
+            [task.latitude for task in candidates],
+            [task.longitude for task in candidates]
+        )
+        order = distances.argsort()
         
         return jsonify({
-            'tasks': [{
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'completed': task.completed,
-                'due_time': task.due_time,
-                'location': task.location,
-                'latitude': task.latitude,
-                'longitude': task.longitude,
-                'created_at': task.created_at.isoformat()
-            } for task in tasks]
+            'tasks': [
+                dict(serialize_task(candidates[i]), distance=round(float(distances[i]), 1))
+                for i in order if distances[i] <= radius
+            ]
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/tasks', methods=['POST'])
+@api.route('/tasks', methods=['POST'])
 @jwt_required()
 def create_task():
     try:
         data = request.get_json()
         user_id = get_jwt_identity()
         
-        # Extract location coordinates if location is provided
-        latitude, longitude = None, None
-        if data.get('location'):
-            coords = geocode_location(data['location'])
-            if coords:
-                latitude, longitude = coords
-        
+        # Insert immediately; coordinates are resolved in the background
         task = Task(
             user_id=user_id,
             title=data.get('title', ''),
             description=data.get('description', ''),
             due_time=data.get('due_time'),
             location=data.get('location'),
-            latitude=latitude,
-            longitude=longitude
+            geocode_status=GEOCODE_PENDING if data.get('location') else None
         )
         
         db.session.add(task)
+        task.version = bump_user_stats(user_id, tasks_total=1, task_writes=1)
         db.session.commit()
         
+        if task.location:
+            geocode_pool.submit(geocode_task, task.id)
+            if geocode_pool.synchronous:
+                db.session.refresh(task)
+        
         return jsonify({
             'message': 'Task created successfully',
             'task': {
@@ -410,14 +796,15 @@ def create_task():
                 'due_time': task.due_time,
                 'location': task.location,
                 'latitude': task.latitude,
-                'longitude': task.longitude
+                'longitude': task.longitude,
+                'geocode_status': task.geocode_status
             }
         }), 201
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/tasks/<int:task_id>/toggle', methods=['PUT'])
+@api.route('/tasks/<int:task_id>/toggle', methods=['PUT'])
 @jwt_required()
 def toggle_task(task_id):
     try:
@@ -428,6 +815,7 @@ def toggle_task(task_id):
             return jsonify({'error': 'Task not found'}), 404
         
         task.completed = not task.completed
+        task.version = bump_user_stats(user_id, tasks_completed=1 if task.completed else -1, task_writes=1)
         db.session.commit()
         
         return jsonify({
@@ -438,8 +826,126 @@ def toggle_task(task_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/tasks/bulk', methods=['POST'])
+@jwt_required()
+def create_tasks_bulk():
+    try:
+        data = request.get_json()
+        items = data.get('tasks') if data else None
+        user_id = get_jwt_identity()
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'tasks must be a non-empty list'}), 400
+        if len(items) > current_app.config['TASKS_BULK_MAX']:
+            return jsonify({'error': f"At most {current_app.config['TASKS_BULK_MAX']} tasks per request"}), 400
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'each task must be an object'}), 400
+        
+        now = datetime.utcnow()
+        # Reserve the sync versions first; the counters are bumped after the INSERT, so a
+        # user without a stats row is counted from history without the new tasks, then adjusted
+        last_version = bump_user_stats(user_id, task_writes=len(items))
+        first_version = last_version - len(items) + 1
+        rows = [{
+            'user_id': user_id,
+            'title': item.get('title', ''),
+            'description': item.get('description', ''),
+            'due_time': item.get('due_time'),
+            'location': item.get('location'),
+            'geocode_status': GEOCODE_PENDING if item.get('location') else None,
+            'completed': False,
+            'version': first_version + offset,
+            'created_at': now,
+            'updated_at': now
+        } for offset, item in enumerate(items)]
+        
+        # One multi-row INSERT in the same transaction as the counter updates
+        task_ids = db.session.execute(
+            db.insert(Task).returning(Task.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        bump_user_stats(user_id, tasks_total=len(task_ids))
+        db.session.commit()
+        
+        # Geocode each distinct location once, concurrently on the geocoding pool
+        by_location = {}
+        for task_id, row in zip(task_ids, rows):
+            if row['location']:
+                by_location.setdefault(row['location'], []).append(task_id)
+        for location, ids in by_location.items():
+            geocode_pool.submit(geocode_task_group, location, ids)
+        
+        tasks = Task.query.filter(Task.id.in_(task_ids)).order_by(Task.id).all()
+        return jsonify({
+            'message': f'{len(tasks)} tasks created successfully',
+            'tasks': [serialize_task(task) for task in tasks]
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/tasks/bulk/toggle', methods=['PUT'])
+@jwt_required()
+def toggle_tasks_bulk():
+    try:
+        data = request.get_json()
+        task_ids = data.get('task_ids') if data else None
+        completed = data.get('completed') if data else None  # optional: set instead of toggle
+        user_id = get_jwt_identity()
+        
+        if not isinstance(task_ids, list) or not task_ids:
+            return jsonify({'error': 'task_ids must be a non-empty list'}), 400
+        if len(task_ids) > current_app.config['TASKS_BULK_MAX']:
+            return jsonify({'error': f"At most {current_app.config['TASKS_BULK_MAX']} tasks per request"}), 400
+        if not all(isinstance(task_id, int) and not isinstance(task_id, bool) for task_id in task_ids):
+            return jsonify({'error': 'task_ids must be integers'}), 400
+        if completed is not None and not isinstance(completed, bool):
+            return jsonify({'error': 'completed must be true or false'}), 400
+        
+        current = db.session.query(Task.id, Task.completed)\
+                            .filter(Task.user_id == user_id, Task.id.in_(task_ids))\
+                            .order_by(Task.id).all()
+        changes = []
+        for task_id, was_completed in current:
+            value = (not was_completed) if completed is None else completed
+            if value != bool(was_completed):
+                changes.append((task_id, value))
+        
+        if changes:
+            completed_delta = sum(1 if value else -1 for _, value in changes)
+            # Versions are reserved before the UPDATE and the counters bumped after it, as in create_tasks_bulk
+            last_version = bump_user_stats(user_id, task_writes=len(changes))
+            first_version = last_version - len(changes) + 1
+            now = datetime.utcnow()
+            
+            # Executemany UPDATE keyed by primary key, committed as one transaction
+            db.session.execute(db.update(Task), [{
+                'id': task_id,
+                'completed': value,
+                'version': first_version + offset,
+                'updated_at': now
+            } for offset, (task_id, value) in enumerate(changes)])
+            bump_user_stats(user_id, tasks_completed=completed_delta)
+            db.session.commit()
+        
+        found = {task_id for task_id, _ in current}
+        updated = dict(changes)
+        return jsonify({
+            'message': f'{len(changes)} tasks updated successfully',
+            'tasks': [
+                {'id': task_id, 'completed': updated.get(task_id, bool(was_completed))}
+                for task_id, was_completed in current
+            ],
+            'not_found': [task_id for task_id in task_ids if task_id not in found]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Location Services Routes
-@app.route('/locations/nearby', methods=['GET'])
+@api.route('/locations/nearby', methods=['GET'])
 @jwt_required()
 def get_nearby_locations():
     try:
@@ -447,56 +953,40 @@ def get_nearby_locations():
         longitude = request.args.get('longitude', type=float)
         radius = request.args.get('radius', 1000, type=int)  # meters
         place_type = request.args.get('type', '')
+        limit = min(request.args.get('limit', 20, type=int), 60)
         
         if not latitude or not longitude:
             return jsonify({'error': 'Latitude and longitude are required'}), 400
+        if radius <= 0 or radius > 50000:
+            return jsonify({'error': 'Radius must be between 0 and 50000 meters'}), 400
         
-        # Use Google Places API
-        url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-        params = {
-            'location': f"{latitude},{longitude}",
-            'radius': radius,
-            'key': GOOGLE_MAPS_API_KEY
-        }
-        
-        if place_type:
-            params['type'] = place_type
+        with metrics.phase('places'):
+            locations, cache_info = places_tiles.nearby(latitude, longitude, radius, place_type)
         
-        response = requests.get(url, params=params)
-        places_data = response.json()
-        
-        locations = []
-        for place in places_data.get('results', []):
-            locations.append({
-                'place_id': place.get('place_id'),
-                'name': place.get('name'),
-                'rating': place.get('rating'),
-                'price_level': place.get('price_level'),
-                'types': place.get('types', []),
-                'location': place.get('geometry', {}).get('location'),
-                'vicinity': place.get('vicinity'),
-                'opening_hours': place.get('opening_hours', {}).get('open_now')
-            })
-        
-        return jsonify({'locations': locations}), 200
+        return jsonify({'locations': locations[:limit], 'cache': cache_info}), 200
         
+    except UpstreamError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/user/profile', methods=['GET'])
+@api.route('/user/profile', methods=['GET'])
 @jwt_required()
 def get_user_profile():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        row = db.session.query(User, UserStats)\
+                        .outerjoin(UserStats, UserStats.user_id == User.id)\
+                        .filter(User.id == user_id).first()
         
-        if not user:
+        if not row:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get user statistics
-        search_count = Search.query.filter_by(user_id=user_id).count()
-        completed_tasks = Task.query.filter_by(user_id=user_id, completed=True).count()
-        total_tasks = Task.query.filter_by(user_id=user_id).count()
+        user, stats = row
+        if stats is None:
+            stats = compute_user_stats(user_id)
+            db.session.add(stats)
+            db.session.commit()
         
         return jsonify({
             'user': {
@@ -506,10 +996,10 @@ def get_user_profile():
                 'created_at': user.created_at.isoformat()
             },
             'stats': {
-                'searches': search_count,
-                'tasks_completed': completed_tasks,
-                'total_tasks': total_tasks,
-                'discoveries': search_count  # Mock discovery count
+                'searches': stats.searches,
+                'tasks_completed': stats.tasks_completed,
+                'total_tasks': stats.tasks_total,
+                'discoveries': stats.searches  # Mock discovery count
             }
         }), 200
         
@@ -517,54 +1007,942 @@ def get_user_profile():
         return jsonify({'error': str(e)}), 500
 
 # Utility Functions
-def generate_suggestions(query):
-    """Generate smart suggestions based on the query"""
-    suggestions = [
-        f"Find {query} nearby",
-        f"Best {query} in the area",
-        f"Reviews for {query}",
-        f"Alternatives to {query}"
-    ]
-    return suggestions[:3]
+def rehash_password(user_id, old_hash, password):
+    """Upgrade a stored hash to the configured method and cost after a successful login"""
+    new_hash = password_hasher.hash(password)
+    db.session.execute(
+        db.update(User)
+          .where(User.id == user_id, User.password_hash == old_hash)
+          .values(password_hash=new_hash)
+    )
+    db.session.commit()
 
-def extract_objects(ai_result):
-    """Extract detected objects from AI response"""
-    # Mock object detection - in production, use computer vision APIs
-    return ["object1", "object2", "object3"]
+def serialize_task(task):
+    """Convert a Task row to its API representation"""
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'completed': task.completed,
+        'due_time': task.due_time,
+        'location': task.location,
+        'latitude': task.latitude,
+        'longitude': task.longitude,
+        'geocode_status': task.geocode_status,
+        'version': task.version,
+        'created_at': task.created_at.isoformat(),
+        'updated_at': task.updated_at.isoformat() if task.updated_at else None
+    }
 
-def geocode_location(location_name):
-    """Convert location name to coordinates"""
+def build_chat_context(user_id, message):
+    """Build the prompt for a chat turn from the user's cached conversation context"""
+    return chat_contexts.build_messages(user_id, CHAT_SYSTEM_PROMPT, message)
+
+def record_chat_turn(user_id, message, response, created_at):
+    """Update the cached context in place and compact it off the request path if needed"""
+    if chat_contexts.append(user_id, message, response, utc_timestamp(created_at)):
+        chat_summary_pool.submit(chat_contexts.compact, user_id)
+
+def utc_timestamp(value):
+    """Epoch seconds for a naive UTC datetime"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def load_chat_history(user_id, limit, since=None):
+    """Up to limit recent (message, response, created_at) turns after since (epoch), oldest first"""
+    query = ChatMessage.query.filter_by(user_id=user_id)
+    if since is not None:
+        # A millisecond of slack for float rounding; the caller drops turns at or before since
+        query = query.filter(ChatMessage.created_at >= datetime.utcfromtimestamp(since - 0.001))
+    recent_messages = query.order_by(ChatMessage.created_at.desc()).limit(limit).all()
+    return [(msg.message, msg.response, utc_timestamp(msg.created_at)) for msg in reversed(recent_messages)]
+
+def load_latest_chat_time(user_id):
+    """Epoch time of the user's latest stored chat message, or None; checks an in-process context is current"""
+    latest = db.session.query(db.func.max(ChatMessage.created_at)).filter_by(user_id=user_id).scalar()
+    return utc_timestamp(latest) if latest else None
+
+def load_chat_summary(user_id):
+    """The saved (summary, through) for a user, or None"""
+    row = db.session.get(ChatSummary, user_id)
+    return (row.summary, row.through) if row else None
+
+def save_chat_summary(user_id, summary, through):
+    """Save a running summary unless one covering later turns is already saved"""
+    try:
+        updated = db.session.execute(
+            db.update(ChatSummary)
+              .where(ChatSummary.user_id == user_id, ChatSummary.through < through)
+              .values(summary=summary, through=through, updated_at=datetime.utcnow())
+        ).rowcount
+        if not updated and db.session.get(ChatSummary, user_id) is None:
+            db.session.add(ChatSummary(user_id=user_id, summary=summary, through=through))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker saved the first summary at the same time
+        db.session.rollback()
+
+def summarize_conversation(summary, turns):
+    """Fold older chat turns into a running summary"""
+    transcript = []
+    if summary:
+        transcript.append(f"Earlier summary: {summary}")
+    for user_text, assistant_text in turns:
+        transcript.append(f"User: {user_text}")
+        transcript.append(f"Assistant: {assistant_text}")
+    
+    with metrics.track_upstream('openai_chat'):
+        response = get_openai().ChatCompletion.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": CHAT_SUMMARY_PROMPT},
+                {"role": "user", "content": "\n".join(transcript)}
+            ],
+            max_tokens=current_app.config['CHAT_SUMMARY_MAX_TOKENS'],
+            temperature=0.2
+        )
+    return response.choices[0].message.content
+
+def sse_event(data, event=None):
+    """Format a server-sent event frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+def compute_user_stats(user_id):
+    """Count a user's searches and tasks from scratch (used when no counter row exists yet)"""
+    search_count = db.session.query(db.func.count(Search.id)).filter(Search.user_id == user_id).scalar()
+    total_tasks, completed_tasks = db.session.query(
+        db.func.count(Task.id),
+        db.func.coalesce(db.func.sum(db.case((Task.completed == db.true(), 1), else_=0)), 0)
+    ).filter(Task.user_id == user_id).one()
+    tasks_version = db.session.query(db.func.max(Task.version)).filter(Task.user_id == user_id).scalar()
+    return UserStats(
+        user_id=user_id,
+        searches=search_count,
+        tasks_total=total_tasks,
+        tasks_completed=completed_tasks,
+        tasks_version=tasks_version or 0
+    )
+
+def bump_user_stats(user_id, searches=0, tasks_total=0, tasks_completed=0, task_writes=0):
+    """Adjust a user's counters inside the current transaction, alongside the row being written
+    
+    task_writes reserves that many task sync versions; the highest one is
+    returned so callers can stamp each changed task with its own version.
+    """
+    tasks_version = db.session.execute(
+        db.update(UserStats)
+          .where(UserStats.user_id == user_id)
+          .values(
+              searches=UserStats.searches + searches,
+              tasks_total=UserStats.tasks_total + tasks_total,
+              tasks_completed=UserStats.tasks_completed + tasks_completed,
+              tasks_version=UserStats.tasks_version + task_writes,
+              updated_at=datetime.utcnow()
+          )
+          .returning(UserStats.tasks_version)
+    ).scalar()
+    if tasks_version is None:
+        # No counter row yet (user predates UserStats): count history including the pending write
+        db.session.flush()
+        stats = compute_user_stats(user_id)
+        stats.tasks_version += task_writes
+        db.session.add(stats)
+        tasks_version = stats.tasks_version
+    return tasks_version
+
+def get_tasks_version(user_id):
+    """Current task sync version for a user (a primary-key read)"""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = compute_user_stats(user_id)
+        db.session.add(stats)
+        db.session.commit()
+    return stats.tasks_version
+
+def log_search(user_id, query, search_type, result):
+    """Queue a Search row for the write-behind flusher; returns its pre-assigned ID"""
+    search_id = search_ids.next_id()
+    if search_type in SUGGEST_SEARCH_TYPES:
+        query_suggester.record(user_id, query)
+    log_writer.enqueue({'table': 'search', 'row': {
+        'id': search_id,
+        'user_id': user_id,
+        'query': query,
+        'search_type': search_type,
+        'result': result,
+        'created_at': datetime.utcnow().isoformat()
+    }})
+    return search_id
+
+def load_search_log(since):
+    """Text and voice searches created at or after since (naive UTC), for the suggestion index"""
+    return db.session.execute(
+        db.select(Search.id, Search.user_id, Search.query, Search.created_at)
+        .where(Search.created_at >= since, Search.search_type.in_(SUGGEST_SEARCH_TYPES))
+        .execution_options(yield_per=2000)
+    )
+
+def load_user_searches(user_id, limit):
+    """A user's most recent text and voice queries, newest first"""
+    return db.session.execute(
+        db.select(Search.query, Search.created_at)
+        .where(Search.user_id == user_id, Search.search_type.in_(SUGGEST_SEARCH_TYPES))
+        .order_by(Search.created_at.desc())
+        .limit(limit)
+    ).all()
+
+def log_chat_message(user_id, message, response, created_at=None):
+    """Queue a ChatMessage row for the write-behind flusher; returns its pre-assigned ID"""
+    message_id = chat_message_ids.next_id()
+    log_writer.enqueue({'table': 'chat_message', 'row': {
+        'id': message_id,
+        'user_id': user_id,
+        'message': message,
+        'response': response,
+        'created_at': (created_at or datetime.utcnow()).isoformat()
+    }})
+    return message_id
+
+def flush_log_records(records):
+    """Write a batch of queued log rows with one multi-row INSERT per table, plus the search counters and history index"""
+    rows = {'search': [], 'chat_message': []}
+    for record in records:
+        row = dict(record['row'], created_at=datetime.fromisoformat(record['row']['created_at']))
+        rows[record['table']].append(row)
+    index = history.get_history_index(db.engine)
+    try:
+        if rows['search']:
+            db.session.execute(db.insert(Search), rows['search'])
+        if rows['chat_message']:
+            db.session.execute(db.insert(ChatMessage), rows['chat_message'])
+        if index is not None and index.ready(db.engine):
+            index.index(db.session, rows['search'], rows['chat_message'])
+        searches_by_user = {}
+        for row in rows['search']:
+            searches_by_user[row['user_id']] = searches_by_user.get(row['user_id'], 0) + 1
+        for user_id, searches in searches_by_user.items():
+            bump_user_stats(user_id, searches=searches)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def encode_cursor(created_at, task_id):
+    """Opaque keyset cursor for (created_at, id) pagination"""
+    raw = f"{created_at.isoformat()}|{task_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
     try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            'address': location_name,
-            'key': GOOGLE_MAPS_API_KEY
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(task_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+def cacheable(response, etag):
+    """Mark a per-user response as revalidatable with a weak ETag"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    return cacheable(Response(status=304), etag)
+
+def reconcile_user_stats(batch_size=1000):
+    """Recompute every user's counters in bulk; returns how many rows were corrected"""
+    corrected = 0
+    last_id = 0
+    while True:
+        user_ids = [row[0] for row in db.session.query(User.id)
+                                                .filter(User.id > last_id)
+                                                .order_by(User.id)
+                                                .limit(batch_size).all()]
+        if not user_ids:
+            return corrected
+        low, high = user_ids[0], user_ids[-1]
+        last_id = high
+        
+        search_counts = dict(
+            db.session.query(Search.user_id, db.func.count(Search.id))
+                      .filter(Search.user_id.between(low, high))
+                      .group_by(Search.user_id).all()
+        )
+        task_counts = {
+            user_id: (total, completed or 0, max_version or 0)
+            for user_id, total, completed, max_version in db.session.query(
+                Task.user_id,
+                db.func.count(Task.id),
+                db.func.sum(db.case((Task.completed == db.true(), 1), else_=0)),
+                db.func.max(Task.version)
+            ).filter(Task.user_id.between(low, high)).group_by(Task.user_id).all()
+        }
+        existing = {
+            stats.user_id: stats
+            for stats in UserStats.query.filter(UserStats.user_id.between(low, high)).all()
         }
         
-        response = requests.get(url, params=params)
-        data = response.json()
+        for user_id in user_ids:
+            searches = search_counts.get(user_id, 0)
+            total, completed, max_version = task_counts.get(user_id, (0, 0, 0))
+            stats = existing.get(user_id)
+            if stats is None:
+                # New writes must continue above every version already stamped on a task
+                db.session.add(UserStats(user_id=user_id, searches=searches, tasks_total=total,
+                                         tasks_completed=completed, tasks_version=max_version))
+                corrected += 1
+            elif ((stats.searches, stats.tasks_total, stats.tasks_completed) != (searches, total, completed)
+                  or stats.tasks_version < max_version):
+                # tasks_version is a sync cursor, not a count: it is only ever moved forward
+                stats.searches, stats.tasks_total, stats.tasks_completed = searches, total, completed
+                stats.tasks_version = max(stats.tasks_version, max_version)
+                corrected += 1
+        db.session.commit()
+
+def run_image_search(user_id, image_source, query):
+    """Preprocess an uploaded image (bytes or binary file), analyze it or reuse a near-duplicate's analysis, and log the search"""
+    image = decode_image(image_source)
+    phash = dhash(image)
+    context = (normalize_query(query), IMAGE_SEARCH_MODEL)
+    
+    result = image_analyses.get(phash, *context)
+    cached = result is not None
+    
+    if not cached:
+        jpeg = preprocess_image(
+            image,
+            max_edge=current_app.config['IMAGE_MAX_EDGE'],
+            quality=current_app.config['IMAGE_JPEG_QUALITY']
+        )
+        encoded = base64.b64encode(jpeg).decode('ascii')
         
-        if data['results']:
-            location = data['results'][0]['geometry']['location']
-            return (location['lat'], location['lng'])
+        # Process image with OpenAI Vision API
+        with metrics.track_upstream('openai_vision'):
+            response = get_openai().ChatCompletion.create(
+                model=IMAGE_SEARCH_MODEL,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": f"Analyze this image and provide detailed information. User query: {query}"},
+                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}}
+                        ]
+                    }
+                ],
+                max_tokens=IMAGE_SEARCH_MAX_TOKENS
+            )
         
+        result = response.choices[0].message.content
+        image_analyses.set(phash, result, *context)
+    
+    # Save search to database
+    search_id = log_search(user_id, f"Image search: {query}" if query else "Image identification", 'image', result)
+    
+    return jsonify({
+        'result': result,
+        'search_id': search_id,
+        'confidence': 0.85,  # Mock confidence score
+        'objects_detected': extract_objects(result),
+        'cached': cached
+    }), 200
+
+def transcribe_audio(audio_file):
+    """Transcribe an upload, splitting long WAV recordings on silence and transcribing chunks concurrently"""
+    chunks = split_on_silence(
+        audio_file.stream,
+        target_seconds=current_app.config['TRANSCRIBE_CHUNK_SECONDS'],
+        max_seconds=2 * current_app.config['TRANSCRIBE_CHUNK_SECONDS']
+    )
+    if not chunks:
+        return transcribe_chunk(audio_file)
+    
+    # map() yields results in submission order, so the transcript is stitched back in sequence
+    with metrics.phase('openai_whisper'):
+        texts = transcribe_pool.map(lambda chunk: transcribe_chunk(chunk).strip(), chunks)
+        return ' '.join(text for text in texts if text)
+
+def transcribe_chunk(audio_file):
+    with metrics.track_upstream('openai_whisper'):
+        return get_openai().Audio.transcribe(TRANSCRIBE_MODEL, audio_file)['text']
+
+def dispatch_batch_item(app, item, jwt_context, caller):
+    """Run one /batch sub-request in its own app and request context, admitted like a direct call"""
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        return {'status': 400, 'body': {'error': 'Each request needs a path'}}
+    
+    method = str(item.get('method', 'GET')).upper()
+    headers = {
+        name: value for name, value in (item.get('headers') or {}).items()
+        if name.lower() != 'authorization'
+    }
+    
+    with app.app_context():
+        for attr, value in jwt_context.items():
+            setattr(g, attr, value)
+        with app.test_request_context(item['path'], method=method, json=item.get('body'), headers=headers):
+            if request.routing_exception is not None:
+                return {'status': getattr(request.routing_exception, 'code', 404),
+                        'body': {'error': 'Endpoint not found'}}
+            endpoint = request.url_rule.endpoint
+            if endpoint not in BATCHABLE_ENDPOINTS:
+                return {'status': 400, 'body': {'error': f"{item['path']} cannot be batched"}}
+            
+            try:
+                ticket = admit_endpoint(endpoint, caller)
+            except AdmissionRejected as e:
+                return {'status': e.status, 'body': {'error': str(e)},
+                        'headers': {'Retry-After': str(e.retry_after)}}
+            
+            try:
+                # Call beneath the jwt_required wrapper; the identity is already in g
+                view = app.view_functions[endpoint].__wrapped__
+                response = app.make_response(view(**request.view_args))
+            finally:
+                admission.release(ticket)
+            
+            result = {'status': response.status_code, 'body': response.get_json(silent=True)}
+            if response.headers.get('ETag'):
+                result['headers'] = {'ETag': response.headers['ETag']}
+            return result
+
+def extract_objects(ai_result):
+    """Extract detected objects from AI response"""
+    # Mock object detection - in production, use computer vision APIs
+    return ["object1", "object2", "object3"]
+
+def fetch_places_tile(latitude, longitude, radius, place_type):
+    """Fetch one tile from the Places Nearby Search API; None when not cacheable"""
+    url = f"{GOOGLE_MAPS_BASE_URL}/maps/api/place/nearbysearch/json"
+    params = {
+        'location': f"{latitude},{longitude}",
+        'radius': radius,
+        'key': GOOGLE_MAPS_API_KEY
+    }
+    
+    if place_type:
+        params['type'] = place_type
+    
+    with metrics.track_upstream('places'):
+        places_data = places_client.get_json(url, params=params)
+    
+    if places_data.get('status') not in ('OK', 'ZERO_RESULTS'):
+        return None
+    
+    locations = []
+    for place in places_data.get('results', []):
+        locations.append({
+            'place_id': place.get('place_id'),
+            'name': place.get('name'),
+            'rating': place.get('rating'),
+            'price_level': place.get('price_level'),
+            'types': place.get('types', []),
+            'location': place.get('geometry', {}).get('location'),
+            'vicinity': place.get('vicinity'),
+            'opening_hours': place.get('opening_hours', {}).get('open_now')
+        })
+    return locations
+
+def geocode_location(location_name):
+    """Convert location name to coordinates; None when the address matches nothing
+
+    Raises UpstreamError when the API cannot answer (timeouts, open
+    circuit, quota or other error statuses), so the caller can retry.
+    """
+    url = f"{GOOGLE_MAPS_BASE_URL}/maps/api/geocode/json"
+    params = {
+        'address': location_name,
+        'key': GOOGLE_MAPS_API_KEY
+    }
+    
+    with metrics.track_upstream('geocoding'):
+        try:
+            data = geocoding_client.get_json(url, params=params)
+        except ValueError:
+            raise UpstreamError('geocoding', 'invalid JSON response')
+    
+    status = data.get('status')
+    if status == 'ZERO_RESULTS':
+        return None
+    if status != 'OK' or not data.get('results'):
+        raise UpstreamError('geocoding', f"status {status}")
+    
+    location = data['results'][0]['geometry']['location']
+    return (location['lat'], location['lng'])
+
+def resolve_location(location_name):
+    """Resolve a location name via the hot cache, the GeocodeCache table, then the Geocoding API"""
+    address = normalize_query(location_name)[:200]
+    if not address:
         return None
-    except:
+    
+    cache_key = make_cache_key('geocode', address)
+    cached = geocode_cache.get(cache_key)
+    if cached is not None:
+        return tuple(cached)
+    
+    with _geocode_locks[hash(address) % len(_geocode_locks)]:
+        entry = GeocodeCache.query.filter_by(address=address).first()
+        if entry:
+            coords = (entry.latitude, entry.longitude)
+            geocode_cache.set(cache_key, coords)
+            return coords
+        
+        coords = geocode_location(location_name)
+        if coords:
+            db.session.add(GeocodeCache(address=address, latitude=coords[0], longitude=coords[1]))
+            try:
+                db.session.commit()
+            except Exception:
+                # Another process stored the same address first
+                db.session.rollback()
+            geocode_cache.set(cache_key, coords)
+        return coords
+
+def geocode_task(task_id):
+    """Background job: fill in coordinates for a task created with a location"""
+    task = db.session.get(Task, task_id)
+    if task and task.geocode_status == GEOCODE_PENDING:
+        geocode_task_group(task.location, [task.id])
+
+def geocode_task_group(location, task_ids, attempt=0):
+    """Background job: resolve one location once and apply it to every pending task that uses it"""
+    tasks = Task.query.filter(Task.id.in_(task_ids), Task.geocode_status == GEOCODE_PENDING)\
+                      .order_by(Task.id).all()
+    if not tasks:
+        return
+    
+    try:
+        coords = resolve_location(location)
+    except UpstreamError as e:
+        # Not the address's fault: leave the tasks pending and try again later
+        # (a restart also re-queues them through enqueue_pending_geocodes)
+        delay = min(current_app.config['GEOCODE_RETRY_SECONDS'] * 2 ** attempt, GEOCODE_RETRY_MAX_SECONDS)
+        current_app.logger.warning("Geocoding %d tasks deferred %.0fs: %s", len(tasks), delay, e)
+        geocode_pool.submit_later(delay, geocode_task_group, location, task_ids, attempt + 1)
+        return
+    geohash = geohash_encode(*coords) if coords else None
+    
+    # Each task gets its own sync version; bulk-created groups share one user
+    versions = {}
+    for task in tasks:
+        versions.setdefault(task.user_id, []).append(task)
+    for user_id, user_tasks in versions.items():
+        last_version = bump_user_stats(user_id, task_writes=len(user_tasks))
+        for offset, task in enumerate(user_tasks):
+            task.version = last_version - len(user_tasks) + 1 + offset
+    
+    for task in tasks:
+        if coords:
+            task.latitude, task.longitude = coords
+            task.geohash = geohash
+            task.geocode_status = GEOCODE_RESOLVED
+        else:
+            task.geocode_status = GEOCODE_FAILED
+    db.session.commit()
+
+def enqueue_pending_geocodes():
+    """Re-submit tasks left pending by a previous process (e.g. after a restart)"""
+    pending = db.session.query(Task.id).filter_by(geocode_status=GEOCODE_PENDING).all()
+    for (task_id,) in pending:
+        geocode_pool.submit(geocode_task, task_id)
+    return len(pending)
+
+def backfill_task_geohashes(batch_size=500):
+    """Populate Task.geohash for rows that have coordinates but no cell yet"""
+    updated = 0
+    while True:
+        tasks = Task.query.filter(
+            Task.geohash.is_(None),
+            Task.latitude.isnot(None),
+            Task.longitude.isnot(None)
+        ).limit(batch_size).all()
+        if not tasks:
+            return updated
+        for task in tasks:
+            task.geohash = geohash_encode(task.latitude, task.longitude)
+        db.session.commit()
+        updated += len(tasks)
+
+@api.cli.command('backfill-geohash')
+def backfill_geohash_command():
+    """Compute geohash cells for existing tasks"""
+    print(f"Backfilled {backfill_task_geohashes()} tasks")
+
+@api.cli.command('backfill-history')
+def backfill_history_command():
+    """Add searches and chat messages written before the history index existed"""
+    index = history.get_history_index(db.engine)
+    if index is None:
+        print(f"History search is not supported on {db.engine.dialect.name}")
+        return
+    print(f"Indexed {index.backfill(db.session)} history entries")
+
+# Metrics
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.before_app_request
+def start_request_timer():
+    metrics.start_request()
+
+@api.after_app_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.finish_request(request.method, route, response.status_code, path=request.path)
+    return response
+
+def collect_component_metrics():
+    """Cache hit rates, tile cache savings, circuit breaker states and write-behind backlog"""
+    caches = {
+        'search': search_cache,
+        'chat_context': chat_context_cache,
+        'geocode': geocode_cache,
+        'places': places_cache,
+        'image': image_analyses.cache,
+        'transcript': transcript_cache
+    }
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    yield ('lookate_cache_hits_total', 'counter', 'Response cache hits',
+           [({'cache': name}, s['hits']) for name, s in stats.items()])
+    yield ('lookate_cache_misses_total', 'counter', 'Response cache misses',
+           [({'cache': name}, s['misses']) for name, s in stats.items()])
+    
+    tiles = places_tiles.stats()
+    yield ('lookate_places_tile_hits_total', 'counter', 'Places tiles served from cache',
+           [({}, tiles['tile_hits'])])
+    yield ('lookate_places_tile_misses_total', 'counter', 'Places tiles fetched from Google',
+           [({}, tiles['tile_misses'])])
+    yield ('lookate_places_direct_calls_total', 'counter', 'Nearby requests too wide for tiles, sent to Google uncached',
+           [({}, tiles['direct_calls'])])
+    
+    yield ('lookate_upstream_circuit_open', 'gauge', 'Circuit breaker state (1 when open or half-open)',
+           [({'upstream': client.name}, int(client.breaker.state != client.breaker.CLOSED))
+            for client in (places_client, geocoding_client)])
+    yield ('lookate_write_behind_queued', 'gauge', 'Search and chat rows waiting to be written',
+           [({}, len(log_writer.backend))])
+    yield ('lookate_password_hash_pending', 'gauge', 'Password hash jobs queued or running',
+           [({}, password_hasher.pending())])
+    yield ('lookate_suggest_entries', 'gauge', 'Queries in the autocomplete index',
+           [({}, query_suggester.stats()['entries'])])
+
+metrics.register_collector(collect_component_metrics)
+
+# Admission Control
+def rate_limit_caller():
+    """Rate-limit key: the JWT identity, the submitted email plus client address for login and
+    registration, or the client address for other anonymous or invalid-token requests"""
+    if request.endpoint in AUTH_ENDPOINTS:
+        # Keyed per account as well, so one client cannot use up the limit for everyone behind the same address
+        data = request.get_json(silent=True)
+        email = data.get('email') if isinstance(data, dict) else None
+        email = email.strip().lower()[:254] if isinstance(email, str) else ''
+        return f"auth:{email}:{request.remote_addr}"
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # The route's own jwt_required reports the bad token
+        identity = None
+    return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+def admit_endpoint(endpoint, caller):
+    """Admit one call to endpoint under its cost class; returns a ticket or raises AdmissionRejected"""
+    cost_class = ENDPOINT_COST_CLASSES.get(endpoint, DEFAULT_COST_CLASS)
+    try:
+        with metrics.phase('admission'):
+            return admission.admit(cost_class, caller)
+    except AdmissionRejected as e:
+        admission_rejections.inc(cost_class=cost_class, reason=e.reason)
+        raise
+
+@api.before_app_request
+def admit_request():
+    if request.endpoint is None:
         return None
+    try:
+        g.admission_ticket = admit_endpoint(request.endpoint, rate_limit_caller())
+    except AdmissionRejected as e:
+        return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+
+@api.teardown_app_request
+def release_admission(error):
+    # Runs after a streamed response finishes, so /chat/stream holds its slot while streaming
+    admission.release(g.pop('admission_ticket', None))
+
+def collect_admission_metrics():
+    """Running and queued requests per limited cost class"""
+    stats = admission.stats()
+    yield ('lookate_admission_active', 'gauge', 'Requests running per cost class',
+           [({'cost_class': name}, s['active']) for name, s in stats.items()])
+    yield ('lookate_admission_waiting', 'gauge', 'Requests queued per cost class',
+           [({'cost_class': name}, s['waiting']) for name, s in stats.items()])
+
+metrics.register_collector(collect_admission_metrics)
 
 # Error Handlers
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(413)
+def request_too_large(error):
+    return jsonify({'error': 'Request body too large'}), 413
+
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
-# Initialize database
-@app.before_first_request
-def create_tables():
-    db.create_all()
+@api.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recompute per-user counters to correct drift"""
+    print(f"Corrected {reconcile_user_stats()} user stats rows")
+
+# Database migrations
+@api.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations"""
+    applied = migrations.upgrade(db.engine, db.metadata)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+_startup_lock = threading.Lock()
+_startup_done = False
+
+@api.before_app_request
+def resume_background_work():
+    """Once per process: re-queue geocoding left pending by a previous process"""
+    global _startup_done
+    if _startup_done:
+        return
+    with _startup_lock:
+        if not _startup_done:
+            _startup_done = True
+            enqueue_pending_geocodes()
+
+# Application factory
+def create_upstream_client(name, app):
+    """Pooled, bounded client for one Google Maps API (own pool and circuit breaker)"""
+    return UpstreamClient(
+        name,
+        pool_size=app.config['UPSTREAM_MAX_CONCURRENCY'],
+        connect_timeout=app.config['UPSTREAM_CONNECT_TIMEOUT'],
+        read_timeout=app.config['UPSTREAM_READ_TIMEOUT'],
+        max_retries=app.config['UPSTREAM_MAX_RETRIES'],
+        max_concurrency=app.config['UPSTREAM_MAX_CONCURRENCY']
+    )
+
+def init_services(app):
+    """Create the caches, pools and upstream clients the routes use, from app.config"""
+    global OPENAI_API_KEY, OPENAI_API_BASE, GOOGLE_MAPS_API_KEY, GOOGLE_MAPS_BASE_URL
+    global places_client, geocoding_client, search_cache, chat_context_cache, chat_contexts
+    global geocode_cache, geocode_pool, places_cache, places_tiles, image_analyses
+    global transcript_cache, transcribe_pool, batch_pool, chat_summary_pool
+    global password_hasher, password_rehash_pool, search_ids, chat_message_ids, log_writer
+    global query_suggester, admission
+    
+    OPENAI_API_KEY = app.config['OPENAI_API_KEY']
+    OPENAI_API_BASE = app.config['OPENAI_API_BASE']
+    if _openai is not None:
+        _openai.api_key = OPENAI_API_KEY
+        _openai.api_base = OPENAI_API_BASE
+    GOOGLE_MAPS_API_KEY = app.config['GOOGLE_MAPS_API_KEY']
+    GOOGLE_MAPS_BASE_URL = app.config['GOOGLE_MAPS_BASE_URL'].rstrip('/')
+    
+    places_client = create_upstream_client('places', app)
+    geocoding_client = create_upstream_client('geocoding', app)
+    
+    # Response cache for AI search results (Redis when available, in-process LRU otherwise)
+    search_cache = create_cache(
+        redis_url=app.config['REDIS_URL'],
+        max_entries=app.config['SEARCH_CACHE_MAX_ENTRIES'],
+        default_ttl=app.config['SEARCH_CACHE_TTL'],
+        prefix='lookate:search:'
+    )
+    
+    # Per-user chat context (summary + recent turns) kept within a token budget
+    chat_context_cache = create_cache(
+        redis_url=app.config['REDIS_URL'],
+        max_entries=10000,
+        default_ttl=app.config['CHAT_CONTEXT_TTL'],
+        prefix='lookate:chat:'
+    )
+    chat_contexts = ConversationStore(
+        chat_context_cache,
+        load_chat_history,
+        summarize_conversation,
+        load_summary=load_chat_summary,
+        save_summary=save_chat_summary,
+        load_latest=load_latest_chat_time,
+        token_budget=app.config['CHAT_CONTEXT_TOKEN_BUDGET']
+    )
+    chat_summary_pool = BackgroundPool(app, max_workers=2, name='lookate-chat-summary')
+    
+    # Geocoding: hot address cache in front of the GeocodeCache table, resolved off the request path
+    geocode_cache = create_cache(
+        redis_url=app.config['REDIS_URL'],
+        max_entries=4096,
+        default_ttl=app.config['GEOCODE_CACHE_TTL'],
+        prefix='lookate:geocode:'
+    )
+    geocode_pool = BackgroundPool(
+        app,
+        max_workers=app.config['GEOCODE_WORKERS'],
+        name='lookate-geocode',
+        synchronous=not app.config['GEOCODE_ASYNC']
+    )
+    
+    # Places Nearby Search results cached per (geohash tile, type)
+    places_cache = create_cache(
+        redis_url=app.config['REDIS_URL'],
+        max_entries=8192,
+        default_ttl=app.config['PLACES_TILE_TTL'],
+        prefix='lookate:places:'
+    )
+    places_tiles = PlacesTileCache(places_cache, fetch_places_tile, max_tiles=app.config['PLACES_MAX_TILES'])
+    
+    # Vision analyses keyed by perceptual hash, so near-identical photos share one API call
+    image_analyses = ImageAnalysisCache(
+        create_cache(
+            redis_url=app.config['REDIS_URL'],
+            max_entries=4096,
+            default_ttl=app.config['IMAGE_CACHE_TTL'],
+            prefix='lookate:image:'
+        ),
+        max_distance=app.config['IMAGE_HASH_MAX_DISTANCE']
+    )
+    
+    # Whisper transcripts keyed by audio content hash, and a pool for chunked transcription
+    transcript_cache = create_cache(
+        redis_url=app.config['REDIS_URL'],
+        max_entries=2048,
+        default_ttl=app.config['TRANSCRIPT_CACHE_TTL'],
+        prefix='lookate:transcript:'
+    )
+    transcribe_pool = ThreadPoolExecutor(
+        max_workers=app.config['TRANSCRIBE_WORKERS'],
+        thread_name_prefix='lookate-transcribe'
+    )
+    
+    # Sub-requests of /batch run here; reads between writes run concurrently
+    batch_pool = ThreadPoolExecutor(
+        max_workers=app.config['BATCH_WORKERS'],
+        thread_name_prefix='lookate-batch'
+    )
+    
+    # Password hashing runs in worker processes so key derivation never holds this process's GIL
+    password_hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT']
+    )
+    password_rehash_pool = BackgroundPool(app, max_workers=1, name='lookate-password-rehash')
+    
+    # Search and chat logs are written behind the response in batched inserts, with pre-assigned IDs
+    search_ids = IdAllocator(lambda: db.engine, 'search', 'search', block_size=app.config['WRITE_BEHIND_ID_BLOCK'])
+    chat_message_ids = IdAllocator(lambda: db.engine, 'chat_message', 'chat_message',
+                                   block_size=app.config['WRITE_BEHIND_ID_BLOCK'])
+    log_writer = WriteBehindQueue(
+        app,
+        flush_log_records,
+        create_queue_backend(app.config['REDIS_URL']),
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+        synchronous=not app.config['WRITE_BEHIND_ENABLED']
+    )
+    
+    # Concurrency caps and per-user rate limits per cost class (buckets shared through Redis when set)
+    max_wait = app.config['ADMISSION_MAX_WAIT_MS'] / 1000.0
+    admission = AdmissionController(
+        [
+            CostClass(
+                'heavy',
+                concurrency=app.config['ADMISSION_HEAVY_CONCURRENCY'],
+                queue_size=app.config['ADMISSION_HEAVY_QUEUE'],
+                max_wait=max_wait,
+                rate_per_minute=app.config['ADMISSION_HEAVY_RATE'],
+                burst=app.config['ADMISSION_HEAVY_BURST']
+            ),
+            CostClass(
+                'ai',
+                concurrency=app.config['ADMISSION_AI_CONCURRENCY'],
+                queue_size=app.config['ADMISSION_AI_QUEUE'],
+                max_wait=max_wait,
+                rate_per_minute=app.config['ADMISSION_AI_RATE'],
+                burst=app.config['ADMISSION_AI_BURST']
+            ),
+            CostClass(
+                'standard',
+                rate_per_minute=app.config['ADMISSION_STANDARD_RATE'],
+                burst=app.config['ADMISSION_STANDARD_BURST']
+            )
+        ],
+        create_rate_limiter(app.config['REDIS_URL']),
+        enabled=app.config['ADMISSION_ENABLED']
+    )
+    
+    # Prefix autocomplete over the search log, refreshed in the background
+    query_suggester = QuerySuggester(
+        app,
+        load_search_log,
+        load_user_searches,
+        half_life_hours=app.config['SUGGEST_HALF_LIFE_HOURS'],
+        min_users=app.config['SUGGEST_MIN_USERS'],
+        max_entries=app.config['SUGGEST_MAX_ENTRIES'],
+        refresh_interval=app.config['SUGGEST_REFRESH_SECONDS']
+    )
+
+def create_app(config_name=None):
+    """Build the Lookate application for a config.py environment (FLASK_CONFIG, default 'default')"""
+    config_name = config_name or os.environ.get('FLASK_CONFIG', 'default')
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    if app.config['TRUSTED_PROXY_COUNT']:
+        # Take the client address and scheme from the X-Forwarded-* headers set by the load balancer
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'],
+                                x_proto=app.config['TRUSTED_PROXY_COUNT'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', serving.engine_options())
+    
+    db.init_app(app)
+    jwt.init_app(app)
+    app.register_blueprint(api)
+    
+    metrics.slow_request_threshold = app.config['SLOW_REQUEST_THRESHOLD_MS'] / 1000.0
+    init_services(app)
+    return app
+
+def warmup(app):
+    """Pay one-off startup costs once, before gunicorn forks its workers
+
+    Imports the lazily loaded SDKs, configures the ORM mappers, connects
+    to the database so the dialect is initialized, creates the upstream
+    HTTP sessions, loads recently used addresses into the geocode cache
+    and builds the autocomplete index. Workers then inherit all of it
+    copy-on-write. Database connections are closed again so no socket is
+    shared across the fork.
+    """
+    get_openai()
+    import numpy  # noqa: F401  (audio splitting, nearby-task distances)
+    from PIL import Image  # noqa: F401  (image preprocessing)
+    
+    for client in (places_client, geocoding_client):
+        client.session
+    
+    with app.app_context():
+        configure_mappers()
+        db.session.execute(db.text('SELECT 1'))
+        
+        entries = app.config['WARMUP_GEOCODE_ENTRIES']
+        if entries:
+            recent = GeocodeCache.query.order_by(GeocodeCache.created_at.desc()).limit(entries).all()
+            for entry in recent:
+                geocode_cache.set(make_cache_key('geocode', entry.address), (entry.latitude, entry.longitude))
+        
+        query_suggester.refresh()
+        db.session.remove()
+        db.engine.dispose()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,95 @@
+"""
+Audio Helpers for Lookate API
+Content hashing and silence-based chunking for voice search
+
+Transcripts are cached by the SHA-256 of the uploaded audio, so a
+retried upload of the same clip skips Whisper entirely. Long PCM WAV
+recordings are split at quiet points into chunks that can be
+transcribed concurrently and stitched back together in order. Formats
+the standard library cannot decode are transcribed as a single chunk.
+"""
+
+import hashlib
+import io
+import wave
+
+FRAME_SECONDS = 0.05
+
+
+def content_hash(stream, chunk_size=64 * 1024):
+    """SHA-256 of a binary file object; the stream is rewound afterwards"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _read_wav(stream):
+    try:
+        with wave.open(stream, 'rb') as wav:
+            params = wav.getparams()
+            frames = wav.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        return None, None
+    finally:
+        stream.seek(0)
+    if params.sampwidth != 2:
+        return None, None
+    return params, frames
+
+
+def _encode_wav(params, frames):
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav:
+        wav.setnchannels(params.nchannels)
+        wav.setsampwidth(params.sampwidth)
+        wav.setframerate(params.framerate)
+        wav.writeframes(frames)
+    output.seek(0)
+    output.name = 'chunk.wav'
+    return output
+
+
+def split_on_silence(stream, target_seconds=30, max_seconds=60, silence_ratio=0.1):
+    """Split 16-bit PCM WAV audio into chunks at the quietest point near each target length
+
+    Returns a list of WAV file objects, or None when the audio is not
+    16-bit PCM WAV or is shorter than max_seconds (send it whole).
+    """
+    params, frames = _read_wav(stream)
+    if params is None:
+        return None
+    duration = params.nframes / float(params.framerate)
+    if duration <= max_seconds:
+        return None
+
+    import numpy as np  # imported on first use to keep app import fast
+
+    samples = np.frombuffer(frames, dtype='<i2').reshape(-1, params.nchannels).mean(axis=1)
+    window = max(1, int(params.framerate * FRAME_SECONDS))
+    usable = len(samples) // window * window
+    rms = np.sqrt((samples[:usable].reshape(-1, window) ** 2).mean(axis=1))
+    quiet = rms <= max(rms.max() * silence_ratio, 1.0)
+
+    frame_bytes = params.sampwidth * params.nchannels
+    target = int(target_seconds / FRAME_SECONDS)
+    limit = int(max_seconds / FRAME_SECONDS)
+    chunks = []
+    start = 0
+    total = len(rms)
+    while total - start > limit:
+        # Prefer the quiet window closest to the target length, else cut at the limit
+        candidates = np.flatnonzero(quiet[start + target // 2:start + limit]) + start + target // 2
+        if len(candidates):
+            cut = int(candidates[np.abs(candidates - (start + target)).argmin()])
+        else:
+            cut = start + limit
+        chunks.append(frames[start * window * frame_bytes:cut * window * frame_bytes])
+        start = cut
+    chunks.append(frames[start * window * frame_bytes:])
+    return [_encode_wav(params, chunk) for chunk in chunks]
@@ -0,0 +1,61 @@
+"""
+Background Workers for Lookate API
+Bounded thread pools that run deferred work inside the Flask application context
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundPool:
+    """Size-bounded worker pool for jobs that must not block a request
+
+    Each job runs inside its own application context, so it gets a fresh
+    SQLAlchemy session that is removed when the job finishes. When
+    ``synchronous`` is set (tests, one-off scripts) jobs run inline.
+    """
+
+    def __init__(self, app, max_workers=4, name='lookate-bg', synchronous=False):
+        self.app = app
+        self.synchronous = synchronous
+        self._executor = None if synchronous else ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs); returns a Future, or the result when synchronous"""
+        if self.synchronous:
+            return self._run(fn, *args, **kwargs)
+        return self._executor.submit(self._run, fn, *args, **kwargs)
+
+    def submit_later(self, delay, fn, *args, **kwargs):
+        """Schedule fn after delay seconds; dropped when synchronous, where nothing waits for it"""
+        if self.synchronous:
+            return None
+        timer = threading.Timer(delay, self._submit_if_running, args=(fn, *args), kwargs=kwargs)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _submit_if_running(self, fn, *args, **kwargs):
+        try:
+            self._executor.submit(self._run, fn, *args, **kwargs)
+        except RuntimeError:
+            # The pool was shut down while the timer was waiting
+            pass
+
+    def _run(self, fn, *args, **kwargs):
+        with self.app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                logger.exception("Background job %s failed", getattr(fn, '__name__', fn))
+                return None
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
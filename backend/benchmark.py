@@ -0,0 +1,506 @@
+"""
+Benchmark Harness for Lookate API
+Mixed-workload load test against local stand-ins for OpenAI and Google Maps
+
+Starts fake OpenAI (chat, vision, transcription) and Google Maps
+(geocoding, nearby search) servers with configurable latency and failure
+profiles, runs the app under gunicorn pointed at them, drives a weighted
+mix of API calls and reports p50/p95/p99 latency and requests/sec per
+endpoint. No real API keys are used and nothing is billed.
+
+Usage:
+    python benchmark.py --profile realistic --duration 60 --concurrency 32
+    python benchmark.py --serving-mode async --json results/async.json
+    python benchmark.py --latency openai_chat=2.0 --failure-rate places=0.1
+    python benchmark.py --url http://localhost:5000   # app already running
+
+With --url the app is not started; run it with OPENAI_API_BASE and
+GOOGLE_MAPS_BASE_URL pointing at the fake server (--fake-port).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+UPSTREAMS = ('openai_chat', 'openai_vision', 'openai_whisper', 'geocoding', 'places')
+
+# Upstream latency (seconds) and failure rate per profile
+PROFILES = {
+    'fast': {name: {'latency': 0.005, 'failure_rate': 0.0} for name in UPSTREAMS},
+    'realistic': {
+        'openai_chat': {'latency': 0.8, 'failure_rate': 0.0},
+        'openai_vision': {'latency': 2.5, 'failure_rate': 0.0},
+        'openai_whisper': {'latency': 1.2, 'failure_rate': 0.0},
+        'geocoding': {'latency': 0.12, 'failure_rate': 0.0},
+        'places': {'latency': 0.15, 'failure_rate': 0.0}
+    },
+    'degraded': {
+        'openai_chat': {'latency': 1.6, 'failure_rate': 0.05},
+        'openai_vision': {'latency': 5.0, 'failure_rate': 0.05},
+        'openai_whisper': {'latency': 2.4, 'failure_rate': 0.05},
+        'geocoding': {'latency': 0.3, 'failure_rate': 0.05},
+        'places': {'latency': 0.4, 'failure_rate': 0.05}
+    }
+}
+
+# Relative frequency of each operation in the default mix
+DEFAULT_MIX = {
+    'text_search': 30,
+    'chat': 12,
+    'chat_stream': 3,
+    'image_search': 4,
+    'voice_search': 3,
+    'list_tasks': 15,
+    'create_task': 8,
+    'nearby': 15,
+    'profile': 10
+}
+
+QUERY_TOPICS = ['coffee shops', 'sushi', 'parks', 'museums', 'bookstores', 'gyms', 'pharmacies',
+                'bakeries', 'live music', 'farmers markets', 'hiking trails', 'vegan food',
+                'co-working spaces', 'bike repair', 'vintage clothing', 'rooftop bars', 'ramen',
+                'dog parks', 'art galleries', 'thrift stores']
+QUERY_TEMPLATES = ['best {} nearby', 'cheap {}', '{} open now', 'top rated {}', '{} near downtown',
+                   'quiet {}', '{} for families', 'new {} this month', '{} with parking', 'late night {}']
+
+ADDRESSES = [f"{number} {street}, San Francisco, CA" for number in (100, 250, 500, 1200, 2000)
+             for street in ('Market St', 'Mission St', 'Valencia St', 'Geary Blvd', 'Castro St',
+                            'Haight St', 'Divisadero St', 'Irving St', 'Columbus Ave', 'Polk St')]
+
+CITY_CENTERS = [(37.7749, -122.4194), (40.7128, -74.0060), (51.5074, -0.1278), (35.6762, 139.6503)]
+
+
+def parse_overrides(values, cast=float):
+    """Parse ['name=value', 'a=1,b=2'] into a dict"""
+    overrides = {}
+    for value in values or []:
+        for item in value.split(','):
+            name, _, raw = item.partition('=')
+            overrides[name.strip()] = cast(raw)
+    return overrides
+
+
+# Fake upstreams
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """OpenAI- and Google Maps-shaped responses with simulated latency and failures"""
+
+    protocol_version = 'HTTP/1.1'
+    profile = {}
+    jitter = 0.3
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate(self, upstream):
+        settings = self.profile[upstream]
+        latency = settings['latency'] * random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(latency, 0))
+        return random.random() < settings['failure_rate']
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path.endswith('/chat/completions'):
+            self._chat_completion(json.loads(body or b'{}'))
+        elif path.endswith('/audio/transcriptions'):
+            if self._simulate('openai_whisper'):
+                return self._send_json(500, {'error': {'message': 'simulated failure', 'type': 'server_error'}})
+            self._send_json(200, {'text': random.choice(QUERY_TOPICS) + ' near me'})
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/maps/api/geocode/json':
+            if self._simulate('geocoding'):
+                return self._send_json(503, {'status': 'UNKNOWN_ERROR', 'results': []})
+            self._send_json(200, self._geocode(params.get('address', '')))
+        elif url.path == '/maps/api/place/nearbysearch/json':
+            if self._simulate('places'):
+                return self._send_json(503, {'status': 'UNKNOWN_ERROR', 'results': []})
+            self._send_json(200, self._nearby(params))
+        else:
+            self._send_json(404, {'status': 'NOT_FOUND'})
+
+    def _chat_completion(self, payload):
+        messages = payload.get('messages', [])
+        vision = any(isinstance(message.get('content'), list) for message in messages)
+        if self._simulate('openai_vision' if vision else 'openai_chat'):
+            return self._send_json(500, {'error': {'message': 'simulated failure', 'type': 'server_error'}})
+        words = ('Here are a few places worth a look, with opening hours, '
+                 'prices and how to get there from where you are.').split()
+        if payload.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for word in words:
+                chunk = {'object': 'chat.completion.chunk', 'model': payload.get('model'),
+                         'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+        self._send_json(200, {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion',
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': ' '.join(words)}}],
+            'usage': {'prompt_tokens': 50, 'completion_tokens': len(words), 'total_tokens': 50 + len(words)}
+        })
+
+    def _geocode(self, address):
+        digest = hashlib.sha256(address.encode('utf-8')).digest()
+        lat = 37.70 + digest[0] / 255 * 0.1
+        lng = -122.50 + digest[1] / 255 * 0.1
+        return {'status': 'OK', 'results': [{'geometry': {'location': {'lat': lat, 'lng': lng}}}]}
+
+    def _nearby(self, params):
+        lat, lng = (float(value) for value in params.get('location', '0,0').split(','))
+        radius = float(params.get('radius', 1000))
+        results = []
+        for i in range(10):
+            seed = f"{lat:.4f},{lng:.4f},{params.get('type', '')},{i}"
+            digest = hashlib.sha256(seed.encode('utf-8')).digest()
+            distance = radius * digest[0] / 255
+            bearing = 2 * math.pi * digest[1] / 255
+            results.append({
+                'place_id': hashlib.md5(seed.encode('utf-8')).hexdigest(),
+                'name': f"Place {digest[2]}",
+                'rating': round(3 + digest[3] / 128, 1),
+                'price_level': digest[4] % 4,
+                'types': [params.get('type') or 'point_of_interest'],
+                'geometry': {'location': {
+                    'lat': lat + distance * math.cos(bearing) / 111320,
+                    'lng': lng + distance * math.sin(bearing) / (111320 * max(math.cos(math.radians(lat)), 0.01))
+                }},
+                'vicinity': 'Benchmark St',
+                'opening_hours': {'open_now': bool(digest[5] % 2)}
+            })
+        return {'status': 'OK', 'results': results}
+
+
+def start_fake_upstreams(port, profile, jitter):
+    handler = type('BenchUpstreamHandler', (FakeUpstreamHandler,), {'profile': profile, 'jitter': jitter})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='bench-upstreams', daemon=True).start()
+    return server
+
+
+# App under test
+
+def start_app(port, fake_url, serving_mode, workers, workdir, database_url=None, admission=False):
+    """Migrate a scratch database and start the app under gunicorn"""
+    env = dict(
+        os.environ,
+        FLASK_CONFIG='production',
+        DATABASE_URL=database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        OPENAI_API_KEY='bench',
+        OPENAI_API_BASE=f"{fake_url}/v1",
+        GOOGLE_MAPS_API_KEY='bench',
+        GOOGLE_MAPS_BASE_URL=fake_url,
+        LOOKATE_SERVING_MODE=serving_mode,
+        ADMISSION_ENABLED='true' if admission else 'false',
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}"
+    )
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db-upgrade'],
+                   cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            if requests.get(f"{base_url}/metrics", timeout=5).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('app did not start within 30 seconds')
+
+
+# Workload
+
+def make_jpeg(seed):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+
+def make_wav(seconds=2.0, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype('<i2')
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return output.getvalue()
+
+
+class Workload:
+    """Weighted mix of API calls; each call returns the response status code"""
+
+    def __init__(self, base_url, mix, timeout=60):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.operations = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.operations]
+        queries = [template.format(topic) for topic in QUERY_TOPICS for template in QUERY_TEMPLATES]
+        # Zipf-like popularity so repeated queries exercise the response cache
+        self.queries = queries
+        self.query_weights = [1.0 / (rank + 1) for rank in range(len(queries))]
+        self.images = [make_jpeg(seed) for seed in range(8)]
+        self.audio = make_wav()
+
+    def register_users(self, count):
+        users = []
+        suffix = int(time.time())
+        for i in range(count):
+            response = requests.post(f"{self.base_url}/auth/register", json={
+                'email': f"bench{suffix}-{i}@example.com",
+                'password': 'bench-password',
+                'name': f"Bench User {i}"
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            users.append({'Authorization': f"Bearer {response.json()['access_token']}"})
+        return users
+
+    def run_one(self, session, headers):
+        name = random.choices(self.operations, self.weights)[0]
+        return name, getattr(self, name)(session, headers)
+
+    def _post(self, session, path, headers, **kwargs):
+        return session.post(f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs).status_code
+
+    def _get(self, session, path, headers, params=None):
+        return session.get(f"{self.base_url}{path}", headers=headers, params=params,
+                           timeout=self.timeout).status_code
+
+    def text_search(self, session, headers):
+        query = random.choices(self.queries, self.query_weights)[0]
+        return self._post(session, '/search/text', headers, json={'query': query})
+
+    def chat(self, session, headers):
+        return self._post(session, '/chat', headers, json={'message': random.choice(self.queries)})
+
+    def chat_stream(self, session, headers):
+        response = session.post(f"{self.base_url}/chat/stream", headers=headers, timeout=self.timeout,
+                                json={'message': random.choice(self.queries)}, stream=True)
+        for _ in response.iter_lines():
+            pass
+        return response.status_code
+
+    def image_search(self, session, headers):
+        image = random.choice(self.images)
+        return self._post(session, '/search/image', headers,
+                          files={'image': ('photo.jpg', image, 'image/jpeg')},
+                          data={'query': 'What is this place?'})
+
+    def voice_search(self, session, headers):
+        return self._post(session, '/search/voice', headers,
+                          files={'audio': ('query.wav', self.audio, 'audio/wav')})
+
+    def list_tasks(self, session, headers):
+        return self._get(session, '/tasks', headers, params={'limit': 50})
+
+    def create_task(self, session, headers):
+        return self._post(session, '/tasks', headers, json={
+            'title': f"Errand {random.randint(1, 10000)}",
+            'location': random.choice(ADDRESSES)
+        })
+
+    def nearby(self, session, headers):
+        lat, lng = random.choice(CITY_CENTERS)
+        return self._get(session, '/locations/nearby', headers, params={
+            'latitude': round(lat + random.gauss(0, 0.01), 5),
+            'longitude': round(lng + random.gauss(0, 0.01), 5),
+            'radius': random.choice([500, 1000, 2000]),
+            'type': random.choice(['', 'cafe', 'restaurant'])
+        })
+
+    def profile(self, session, headers):
+        return self._get(session, '/user/profile', headers)
+
+
+def run_load(workload, users, concurrency, duration, warmup):
+    """Run virtual users until the deadline; returns samples recorded after warmup"""
+    samples = []
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    def virtual_user(index):
+        session = requests.Session()
+        headers = users[index % len(users)]
+        local = []
+        while time.monotonic() < deadline:
+            began = time.monotonic()
+            try:
+                name, status = workload.run_one(session, headers)
+            except requests.RequestException:
+                name, status = 'connection_error', 0
+            if began >= measure_from:
+                local.append((name, time.monotonic() - began, status))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=virtual_user, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    """Per-operation count, errors, p50/p95/p99 (ms) and requests/sec"""
+    grouped = {}
+    for name, seconds, status in samples:
+        grouped.setdefault(name, []).append((seconds, status))
+    grouped['total'] = [(seconds, status) for _, seconds, status in samples]
+    results = {}
+    for name, values in sorted(grouped.items()):
+        if not values:
+            continue
+        latencies = np.array([seconds for seconds, _ in values]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        results[name] = {
+            'requests': len(values),
+            'errors': sum(1 for _, status in values if status == 0 or status >= 500),
+            'p50_ms': round(float(p50), 1),
+            'p95_ms': round(float(p95), 1),
+            'p99_ms': round(float(p99), 1),
+            'rps': round(len(values) / duration, 2)
+        }
+    return results
+
+
+def print_report(results):
+    print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, row in results.items():
+        print(f"{name:<18}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['rps']:>10}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the Lookate API against fake upstreams')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='realistic')
+    parser.add_argument('--latency', action='append', help='override upstream latency, e.g. openai_chat=1.5')
+    parser.add_argument('--failure-rate', action='append', help='override failure rate, e.g. places=0.1')
+    parser.add_argument('--jitter', type=float, default=0.3, help='latency varies by +/- this fraction')
+    parser.add_argument('--mix', action='append', help='override operation weights, e.g. text_search=50,nearby=0')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before the measurement')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--users', type=int, default=20, help='registered accounts shared by virtual users')
+    parser.add_argument('--serving-mode', choices=['sync', 'async'], default=os.environ.get('LOOKATE_SERVING_MODE', 'sync'))
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--admission', action='store_true',
+                        help='keep admission control on; off by default so per-user rate limits do not skew results')
+    parser.add_argument('--app-port', type=int, default=5100)
+    parser.add_argument('--fake-port', type=int, default=8900)
+    parser.add_argument('--database-url', help='defaults to a scratch SQLite database')
+    parser.add_argument('--url', help='benchmark an already running app instead of starting one')
+    parser.add_argument('--json', help='write results to this file for comparison across commits')
+    args = parser.parse_args(argv)
+
+    profile = {name: dict(settings) for name, settings in PROFILES[args.profile].items()}
+    for name, value in parse_overrides(args.latency).items():
+        profile[name]['latency'] = value
+    for name, value in parse_overrides(args.failure_rate).items():
+        profile[name]['failure_rate'] = value
+    mix = dict(DEFAULT_MIX, **parse_overrides(args.mix, cast=int))
+
+    fake_server = start_fake_upstreams(args.fake_port, profile, args.jitter)
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    process = None
+    with tempfile.TemporaryDirectory(prefix='lookate-bench-') as workdir:
+        try:
+            if args.url:
+                base_url = args.url.rstrip('/')
+            else:
+                process, base_url = start_app(args.app_port, fake_url, args.serving_mode, args.workers,
+                                              workdir, args.database_url, args.admission)
+            workload = Workload(base_url, mix)
+            users = workload.register_users(args.users)
+            print(f"Running {args.concurrency} virtual users for {args.duration:.0f}s "
+                  f"(+{args.warmup:.0f}s warmup), profile={args.profile}, serving={args.serving_mode}")
+            samples = run_load(workload, users, args.concurrency, args.duration, args.warmup)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+            fake_server.shutdown()
+
+    results = summarize(samples, args.duration)
+    print_report(results)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({
+                'revision': git_revision(),
+                'profile': args.profile,
+                'upstreams': profile,
+                'mix': mix,
+                'serving_mode': args.serving_mode,
+                'workers': args.workers,
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Response Cache for Lookate API
+Pluggable caching layer placed in front of expensive upstream calls
+
+Backends:
+- RedisBackend: shared across gunicorn workers and hosts
+- LRUBackend: in-process fallback with size-bounded eviction
+
+Both backends honour per-entry TTLs. ResponseCache wraps a backend and
+keeps hit/miss counters so cache effectiveness can be reported.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(text):
+    """Normalize free-form query text so trivially different phrasings share a key"""
+    text = _WHITESPACE_RE.sub(' ', (text or '').strip().lower())
+    return text.rstrip('?!. ')
+
+
+def make_cache_key(namespace, *parts):
+    """Build a stable cache key from a namespace and JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class LRUBackend:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    shared = False  # each worker process has its own entries
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Redis-backed cache; values are stored as JSON with a native TTL
+
+    Size-bounded eviction is delegated to the Redis server
+    (maxmemory + allkeys-lru). Connection errors are treated as misses so
+    a Redis outage degrades to calling the upstream directly.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix='lookate:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+        except Exception:
+            pass
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception:
+            pass
+
+
+class ResponseCache:
+    """Cache facade with a default TTL and hit/miss accounting"""
+
+    def __init__(self, backend, default_ttl=3600):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl if ttl is not None else self.default_ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    @property
+    def shared(self):
+        """True when every worker sees the same entries"""
+        return self.backend.shared
+
+    def stats(self):
+        """Return hit/miss counters and the current hit ratio"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0
+            }
+
+
+_redis_clients = {}
+
+
+def get_redis_client(redis_url):
+    """Return a shared, reachable Redis client for the URL, or None"""
+    if not redis_url:
+        return None
+    if redis_url in _redis_clients:
+        return _redis_clients[redis_url]
+    try:
+        import redis
+        client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+    except Exception:
+        client = None
+    _redis_clients[redis_url] = client
+    return client
+
+
+def create_cache(redis_url=None, max_entries=1024, default_ttl=3600, prefix='lookate:'):
+    """Create a ResponseCache using Redis when reachable, else an in-process LRU"""
+    client = get_redis_client(redis_url)
+    if client is not None:
+        backend = RedisBackend(client, prefix=prefix)
+    else:
+        backend = LRUBackend(max_entries=max_entries)
+    return ResponseCache(backend, default_ttl=default_ttl)
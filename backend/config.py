@@ -17,8 +17,96 @@ class Config:
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
     
+    # API base URLs (point these at local stand-ins for benchmarks)
+    OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1')
+    GOOGLE_MAPS_BASE_URL = os.environ.get('GOOGLE_MAPS_BASE_URL', 'https://maps.googleapis.com')
+    
+    # Caching
+    REDIS_URL = os.environ.get('REDIS_URL')
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 6 * 3600))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 2048))
+    
+    # Background geocoding
+    GEOCODE_ASYNC = os.environ.get('GEOCODE_ASYNC', 'true').lower() == 'true'
+    GEOCODE_WORKERS = int(os.environ.get('GEOCODE_WORKERS', 4))
+    GEOCODE_CACHE_TTL = int(os.environ.get('GEOCODE_CACHE_TTL', 30 * 24 * 3600))
+    # First retry delay after a geocoding outage; doubles per attempt up to an hour
+    GEOCODE_RETRY_SECONDS = float(os.environ.get('GEOCODE_RETRY_SECONDS', 60))
+    
+    # Places tile cache
+    PLACES_TILE_TTL = int(os.environ.get('PLACES_TILE_TTL', 15 * 60))
+    PLACES_MAX_TILES = int(os.environ.get('PLACES_MAX_TILES', 16))
+    
+    # Upstream HTTP clients (Google Maps)
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+    UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+    UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 2))
+    UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 16))
+    
+    # Chat context
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', 1500))
+    CHAT_CONTEXT_TTL = int(os.environ.get('CHAT_CONTEXT_TTL', 7 * 24 * 3600))
+    CHAT_SUMMARY_MAX_TOKENS = int(os.environ.get('CHAT_SUMMARY_MAX_TOKENS', 200))
+    
+    # Image search preprocessing and dedupe
+    IMAGE_MAX_EDGE = int(os.environ.get('IMAGE_MAX_EDGE', 1024))
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 80))
+    IMAGE_HASH_MAX_DISTANCE = int(os.environ.get('IMAGE_HASH_MAX_DISTANCE', 3))
+    IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL', 7 * 24 * 3600))
+    
+    # Voice search transcription
+    TRANSCRIPT_CACHE_TTL = int(os.environ.get('TRANSCRIPT_CACHE_TTL', 24 * 3600))
+    TRANSCRIBE_WORKERS = int(os.environ.get('TRANSCRIBE_WORKERS', 4))
+    TRANSCRIBE_CHUNK_SECONDS = int(os.environ.get('TRANSCRIBE_CHUNK_SECONDS', 30))
+    
+    # Batch endpoint
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 8))
+    TASKS_BULK_MAX = int(os.environ.get('TASKS_BULK_MAX', 200))
+    
+    # Write-behind persistence for search and chat logs
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 200))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    WRITE_BEHIND_ID_BLOCK = int(os.environ.get('WRITE_BEHIND_ID_BLOCK', 100))
+    
+    # Metrics and slow-request logging (0 disables the slow-request log)
+    SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 1000))
+    
+    # Password hashing (method includes the cost; stored hashes are upgraded on login)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Admission control: per-process concurrency caps with a bounded wait queue, and
+    # per-user rate limits (requests per minute, 0 disables) for each cost class
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true'
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted (0 uses the socket address)
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    ADMISSION_MAX_WAIT_MS = int(os.environ.get('ADMISSION_MAX_WAIT_MS', 2000))
+    ADMISSION_HEAVY_CONCURRENCY = int(os.environ.get('ADMISSION_HEAVY_CONCURRENCY', 8))
+    ADMISSION_HEAVY_QUEUE = int(os.environ.get('ADMISSION_HEAVY_QUEUE', 16))
+    ADMISSION_HEAVY_RATE = int(os.environ.get('ADMISSION_HEAVY_RATE', 10))
+    ADMISSION_HEAVY_BURST = int(os.environ.get('ADMISSION_HEAVY_BURST', 5))
+    ADMISSION_AI_CONCURRENCY = int(os.environ.get('ADMISSION_AI_CONCURRENCY', 32))
+    ADMISSION_AI_QUEUE = int(os.environ.get('ADMISSION_AI_QUEUE', 64))
+    ADMISSION_AI_RATE = int(os.environ.get('ADMISSION_AI_RATE', 30))
+    ADMISSION_AI_BURST = int(os.environ.get('ADMISSION_AI_BURST', 10))
+    ADMISSION_STANDARD_RATE = int(os.environ.get('ADMISSION_STANDARD_RATE', 600))
+    ADMISSION_STANDARD_BURST = int(os.environ.get('ADMISSION_STANDARD_BURST', 100))
+    
+    # Search autocomplete (/search/suggest)
+    SUGGEST_HALF_LIFE_HOURS = float(os.environ.get('SUGGEST_HALF_LIFE_HOURS', 72))
+    SUGGEST_MIN_USERS = int(os.environ.get('SUGGEST_MIN_USERS', 3))
+    SUGGEST_MAX_ENTRIES = int(os.environ.get('SUGGEST_MAX_ENTRIES', 100000))
+    SUGGEST_REFRESH_SECONDS = float(os.environ.get('SUGGEST_REFRESH_SECONDS', 60))
+    
+    # Startup warmup (recently geocoded addresses loaded into the cache before workers fork)
+    WARMUP_GEOCODE_ENTRIES = int(os.environ.get('WARMUP_GEOCODE_ENTRIES', 1000))
+    
     # File Upload Settings
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max file size
     UPLOAD_FOLDER = 'uploads'
 
 class DevelopmentConfig(Config):
@@ -36,6 +124,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
     WTF_CSRF_ENABLED = False
+    GEOCODE_ASYNC = False
+    WRITE_BEHIND_ENABLED = False
+    PASSWORD_HASH_WORKERS = 0
+    ADMISSION_ENABLED = False
 
 # Configuration mapping
 config = {
@@ -0,0 +1,181 @@
+"""
+Conversation Context Store for Lookate API
+Per-user chat context kept in cache and trimmed to a token budget
+
+Each user's context is a running summary plus the most recent turns.
+It is updated in place after every reply, so building a prompt needs no
+database query. Turns that no longer fit the budget move to an overflow
+list, which a background job folds into the summary. Prompt size then
+stays flat however long the conversation grows.
+
+The summary is also saved with the time of the last turn it covers, so
+any worker can rebuild a context from the saved summary plus the turns
+stored after it, and no turn is summarized twice.
+
+With an in-process cache each worker has its own copy of a context, so
+a turn served by another worker would be missing from it. In that case
+the cached context is checked against the time of the user's latest
+stored message (one indexed query) and the newer turns are appended.
+"""
+
+import threading
+import time
+
+from cache import make_cache_key
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text or '') // 4 + 1
+
+
+def turn_tokens(turn):
+    return estimate_tokens(turn[0]) + estimate_tokens(turn[1]) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationStore:
+    """Token-budgeted conversation contexts on top of a ResponseCache
+
+    Turns are kept as [message, response, created_at] with created_at in
+    epoch seconds.
+
+    ``load_history(user_id, limit, since)`` returns up to ``limit`` of the
+    most recent (message, response, created_at) turns stored after
+    ``since`` (None for all), oldest first. ``summarize(summary, turns)``
+    returns a new summary folding (message, response) ``turns`` into the
+    previous one. ``load_summary(user_id)`` returns the saved
+    (summary, through) or None, and ``save_summary(user_id, summary,
+    through)`` saves one unless a later one is already saved.
+    ``load_latest(user_id)`` returns the epoch time of the user's latest
+    stored message, or None; it is only called when the cache is not
+    shared between workers.
+    """
+
+    def __init__(self, cache, load_history, summarize, load_summary=None, save_summary=None,
+                 load_latest=None, token_budget=1500, summary_trigger_tokens=300, rebuild_limit=20):
+        self.cache = cache
+        self.load_history = load_history
+        self.summarize = summarize
+        self.load_summary = load_summary
+        self.save_summary = save_summary
+        self.load_latest = load_latest
+        self.token_budget = token_budget
+        self.summary_trigger_tokens = summary_trigger_tokens
+        self.rebuild_limit = rebuild_limit
+        # Serializes read-modify-write of a context within this process
+        self._lock = threading.Lock()
+
+    def _key(self, user_id):
+        return make_cache_key('chat-context:v2', user_id)
+
+    def _load_turns(self, user_id, since):
+        # The loader may include the boundary row; keep only turns strictly after since
+        return [list(turn) for turn in self.load_history(user_id, self.rebuild_limit, since)
+                if since is None or turn[2] > since]
+
+    def _rebuild(self, user_id):
+        """Saved summary plus the turns stored after it"""
+        summary, through = (self.load_summary(user_id) if self.load_summary else None) or (None, 0)
+        state = {'summary': summary, 'summary_through': through, 'turns': [], 'overflow': [],
+                 'updated_at': through}
+        for message, response, created_at in self._load_turns(user_id, through or None):
+            self._append_turn(state, message, response, created_at)
+        return state
+
+    def get(self, user_id, check_latest=True):
+        """Return a copy of the user's context, rebuilt on a miss and caught up when behind"""
+        state = self.cache.get(self._key(user_id))
+        if state is None:
+            state = self._rebuild(user_id)
+            self.cache.set(self._key(user_id), state)
+        elif check_latest and not self.cache.shared and self.load_latest is not None:
+            latest = self.load_latest(user_id)
+            if latest is not None and latest > state['updated_at']:
+                # Another worker answered since: append only its turns, keeping the summary
+                with self._lock:
+                    state = self._copy(self.cache.get(self._key(user_id)) or state)
+                    for message, response, created_at in self._load_turns(user_id, state['updated_at']):
+                        self._append_turn(state, message, response, created_at)
+                    saved = self.load_summary(user_id) if self.load_summary else None
+                    if saved is not None and saved[1] > state['summary_through']:
+                        self._adopt_summary(state, *saved)
+                    self.cache.set(self._key(user_id), state)
+        # The in-process backend returns the cached object itself; never mutate it in place
+        return self._copy(state)
+
+    @staticmethod
+    def _copy(state):
+        return dict(state, turns=list(state['turns']), overflow=list(state['overflow']))
+
+    def build_messages(self, user_id, system_prompt, message):
+        """Assemble the prompt: system, summary of older turns, recent turns, new message"""
+        state = self.get(user_id)
+        messages = [{"role": "system", "content": system_prompt}]
+        if state['summary']:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {state['summary']}"
+            })
+        for user_text, assistant_text, _ in state['turns']:
+            messages.append({"role": "user", "content": user_text})
+            messages.append({"role": "assistant", "content": assistant_text})
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def append(self, user_id, message, response, created_at=None):
+        """Record a completed turn; returns True when the overflow should be compacted
+
+        ``created_at`` is the epoch time of the stored message for this
+        turn, so the turn is not mistaken for one from another worker.
+        """
+        with self._lock:
+            state = self.get(user_id, check_latest=False)
+            self._append_turn(state, message, response, created_at or time.time())
+            self.cache.set(self._key(user_id), state)
+        return self.needs_compaction(state)
+
+    def needs_compaction(self, state):
+        return sum(turn_tokens(turn) for turn in state['overflow']) >= self.summary_trigger_tokens
+
+    def compact(self, user_id):
+        """Fold overflowed turns into the running summary"""
+        state = self.get(user_id, check_latest=False)
+        if not state['overflow']:
+            return
+        summary, through = state['summary'], state['summary_through']
+
+        # Another worker may already have folded some of these turns in
+        saved = self.load_summary(user_id) if self.load_summary else None
+        if saved is not None and saved[1] > through:
+            summary, through = saved
+        pending = [turn for turn in state['overflow'] if turn[2] > through]
+        if pending:
+            summary = self.summarize(summary, [turn[:2] for turn in pending])
+            through = pending[-1][2]
+            if self.save_summary:
+                self.save_summary(user_id, summary, through)
+
+        # Re-read so turns appended while summarizing are not lost
+        with self._lock:
+            state = self.get(user_id, check_latest=False)
+            if state['summary_through'] >= through:
+                return
+            self._adopt_summary(state, summary, through)
+            self.cache.set(self._key(user_id), state)
+
+    @staticmethod
+    def _adopt_summary(state, summary, through):
+        """Use a summary covering turns up to through, dropping the turns it covers"""
+        state['summary'] = summary
+        state['summary_through'] = through
+        state['overflow'] = [turn for turn in state['overflow'] if turn[2] > through]
+        state['turns'] = [turn for turn in state['turns'] if turn[2] > through]
+
+    def _append_turn(self, state, message, response, created_at):
+        state['turns'].append([message, response, created_at])
+        state['updated_at'] = max(state['updated_at'], created_at)
+        budget = self.token_budget - estimate_tokens(state['summary'])
+        while len(state['turns']) > 1 and sum(turn_tokens(turn) for turn in state['turns']) > budget:
+            state['overflow'].append(state['turns'].pop(0))
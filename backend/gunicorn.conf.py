@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for Lookate API
+
+LOOKATE_SERVING_MODE=sync   -> sync workers (one request at a time per worker)
+LOOKATE_SERVING_MODE=async  -> gevent workers (WORKER_CONNECTIONS concurrent requests per worker)
+
+The app is loaded from wsgi.py in the master and warmed up before the
+workers fork (PRELOAD_APP=false loads it in each worker instead).
+"""
+
+import os
+
+import config as lookate_config
+from serving import is_async, make_cooperative_db_driver
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() == 'true'
+
+if is_async():
+    if preload_app:
+        # Locks and thread-locals created while preloading must already be greenlet-aware
+        from gevent import monkey
+        monkey.patch_all()
+    # Patched in the master, before any connection is made, so workers inherit it; fails startup on
+    # PostgreSQL without psycogreen
+    make_cooperative_db_driver(lookate_config.config[os.environ.get('FLASK_CONFIG', 'default')].SQLALCHEMY_DATABASE_URI)
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+else:
+    worker_class = 'sync'
+
+
+def worker_exit(server, worker):
+    # Write out queued search/chat log rows before the worker process goes away
+    from writebehind import shutdown_all
+    shutdown_all()
@@ -0,0 +1,250 @@
+"""
+Search History for Lookate API
+Full-text index over each user's past searches and chat messages
+
+Two backends, picked from the database dialect:
+- SQLite (development): an FTS5 table, history_fts, holding a copy of
+  the text. The owner column (u<user_id>) is indexed too, so the user
+  filter is part of the MATCH instead of a scan over every match.
+- PostgreSQL (production): a search_vector tsvector column on search
+  and chat_message with a GIN index. The prompt is weighted above the
+  AI response.
+
+Rows are indexed in the same transaction that inserts them (see
+flush_log_records in app.py). Rows written before the index existed
+are indexed by: flask --app app backfill-history
+
+Each document has a key, source_id * 2 + kind, which is also the FTS5
+rowid. Results are ordered by (score, key), best match (lowest score)
+first, and paginated with a keyset cursor on that pair.
+"""
+
+import base64
+import json
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, text
+
+SEARCH_DOC = 0
+CHAT_DOC = 1
+
+# (kind, table, prompt column, answer column)
+SOURCES = (
+    (SEARCH_DOC, 'search', 'query', 'result'),
+    (CHAT_DOC, 'chat_message', 'message', 'response')
+)
+DOC_TYPES = {SEARCH_DOC: 'search', CHAT_DOC: 'chat'}
+
+TS_CONFIG = 'english'
+HIGHLIGHT_START = '**'
+HIGHLIGHT_END = '**'
+MAX_TERMS = 8
+READY_RECHECK_SECONDS = 60
+
+
+def parse_terms(query):
+    """Split user input into at most MAX_TERMS lowercase words, dropping query syntax"""
+    return re.findall(r'[^\W_]+', (query or '').lower())[:MAX_TERMS]
+
+
+def encode_cursor(score, key):
+    raw = json.dumps([score, key]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        score, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(score), int(key)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+class HistoryIndex:
+    """Dialect-independent part: readiness check and hit formatting"""
+
+    def __init__(self):
+        self._ready = False
+        self._checked_at = None
+
+    def ready(self, engine):
+        """True once the migration has created the index; rechecked at most once a minute until then"""
+        if self._ready:
+            return True
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= READY_RECHECK_SECONDS:
+            self._checked_at = now
+            self._ready = self._exists(engine)
+        return self._ready
+
+    def _hit(self, row):
+        created_at = row.created_at
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        return {
+            'type': DOC_TYPES[row.doc_key % 2],
+            'id': row.doc_key // 2,
+            'created_at': created_at,
+            'prompt': row.prompt,
+            'snippet': row.snippet,
+            'score': row.score,
+            'key': row.doc_key
+        }
+
+
+class SQLiteHistoryIndex(HistoryIndex):
+    """FTS5 table with BM25 ranking (prompt weighted 2:1 over the answer)"""
+
+    def _exists(self, engine):
+        return inspect(engine).has_table('history_fts')
+
+    def index(self, session, searches, messages):
+        rows = [
+            {
+                'key': row['id'] * 2 + kind,
+                'prompt': row.get(prompt) or '',
+                'answer': row.get(answer) or '',
+                'owner': f"u{row['user_id']}",
+                'created_at': row['created_at'].isoformat()
+            }
+            for (kind, _, prompt, answer), batch in zip(SOURCES, (searches, messages))
+            for row in batch
+        ]
+        if rows:
+            # OR REPLACE keeps indexing idempotent if a document was already indexed
+            session.execute(text(
+                'INSERT OR REPLACE INTO history_fts (rowid, prompt, answer, owner, created_at) '
+                'VALUES (:key, :prompt, :answer, :owner, :created_at)'
+            ), rows)
+
+    def search(self, session, user_id, terms, limit, after=None):
+        # Every term must match; the last one is a prefix so partially typed words still hit
+        phrases = ' '.join(f'"{term}"' for term in terms) + '*'
+        match = f'owner : "u{int(user_id)}" AND {{prompt answer}} : ({phrases})'
+        params = {'match': match, 'limit': limit}
+        keyset = ''
+        if after is not None:
+            keyset = 'WHERE (score, doc_key) > (:after_score, :after_key)'
+            params.update(after_score=after[0], after_key=after[1])
+        rows = session.execute(text(
+            'SELECT * FROM ('
+            f"  SELECT rowid AS doc_key, created_at, bm25(history_fts, 2.0, 1.0, 0.0) AS score, "
+            f"  highlight(history_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS prompt, "
+            f"  snippet(history_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24) AS snippet "
+            '  FROM history_fts WHERE history_fts MATCH :match'
+            f') {keyset} ORDER BY score, doc_key LIMIT :limit'
+        ), params)
+        return [self._hit(row) for row in rows]
+
+    def backfill(self, session, batch_size=1000):
+        """Index source rows missing from history_fts; safe to rerun"""
+        indexed = 0
+        for kind, table, prompt, answer in SOURCES:
+            after = 0
+            while True:
+                ids = session.execute(
+                    text(f'SELECT id FROM "{table}" WHERE id > :after ORDER BY id LIMIT :limit'),
+                    {'after': after, 'limit': batch_size}
+                ).scalars().all()
+                if not ids:
+                    break
+                result = session.execute(text(
+                    'INSERT INTO history_fts (rowid, prompt, answer, owner, created_at) '
+                    f"SELECT id * 2 + {kind}, COALESCE({prompt}, ''), COALESCE({answer}, ''), "
+                    "'u' || user_id, created_at "
+                    f'FROM "{table}" WHERE id >= :first AND id <= :last '
+                    f'AND NOT EXISTS (SELECT 1 FROM history_fts WHERE history_fts.rowid = "{table}".id * 2 + {kind})'
+                ), {'first': ids[0], 'last': ids[-1]})
+                session.commit()
+                indexed += max(result.rowcount, 0)
+                after = ids[-1]
+        return indexed
+
+
+class PostgresHistoryIndex(HistoryIndex):
+    """tsvector columns with GIN indexes and ts_rank ranking"""
+
+    def _exists(self, engine):
+        return 'search_vector' in {column['name'] for column in inspect(engine).get_columns('search')}
+
+    @staticmethod
+    def _vector(prompt, answer):
+        return (f"setweight(to_tsvector('{TS_CONFIG}', COALESCE({prompt}, '')), 'A') || "
+                f"setweight(to_tsvector('{TS_CONFIG}', COALESCE({answer}, '')), 'B')")
+
+    def _update(self, session, table, prompt, answer, ids, only_missing=False):
+        missing = ' AND search_vector IS NULL' if only_missing else ''
+        statement = text(
+            f'UPDATE "{table}" SET search_vector = {self._vector(prompt, answer)} '
+            f'WHERE id IN :ids{missing}'
+        ).bindparams(bindparam('ids', expanding=True))
+        return session.execute(statement, {'ids': ids})
+
+    def index(self, session, searches, messages):
+        for (kind, table, prompt, answer), batch in zip(SOURCES, (searches, messages)):
+            if batch:
+                self._update(session, table, prompt, answer, [row['id'] for row in batch])
+
+    def search(self, session, user_id, terms, limit, after=None):
+        params = {
+            'tsquery': ' & '.join(terms[:-1] + [f'{terms[-1]}:*']),
+            'user_id': int(user_id),
+            'limit': limit
+        }
+        keyset = ''
+        if after is not None:
+            keyset = 'WHERE (score, doc_key) > (:after_score, :after_key)'
+            params.update(after_score=after[0], after_key=after[1])
+        hits = ' UNION ALL '.join(
+            f'SELECT t.id * 2 + {kind} AS doc_key, t.created_at, t.{prompt} AS prompt_text, '
+            f't.{answer} AS answer_text, -ts_rank(t.search_vector, q.tsq)::float8 AS score '
+            f'FROM "{table}" AS t, q WHERE t.user_id = :user_id AND t.search_vector @@ q.tsq'
+            for kind, table, prompt, answer in SOURCES
+        )
+        # Headlines are costly, so they are only built for the rows on this page
+        rows = session.execute(text(
+            f"WITH q AS (SELECT to_tsquery('{TS_CONFIG}', :tsquery) AS tsq), "
+            f'page AS (SELECT * FROM ({hits}) AS hits {keyset} ORDER BY score, doc_key LIMIT :limit) '
+            'SELECT doc_key, created_at, score, '
+            f"ts_headline('{TS_CONFIG}', COALESCE(prompt_text, ''), q.tsq, "
+            f"'HighlightAll=true, StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}') AS prompt, "
+            f"ts_headline('{TS_CONFIG}', COALESCE(answer_text, ''), q.tsq, "
+            f"'MaxWords=24, MinWords=12, StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}') AS snippet "
+            'FROM page, q ORDER BY score, doc_key'
+        ), params)
+        return [self._hit(row) for row in rows]
+
+    def backfill(self, session, batch_size=1000):
+        """Fill search_vector where it is still NULL; safe to rerun"""
+        indexed = 0
+        for kind, table, prompt, answer in SOURCES:
+            after = 0
+            while True:
+                ids = session.execute(
+                    text(f'SELECT id FROM "{table}" WHERE id > :after ORDER BY id LIMIT :limit'),
+                    {'after': after, 'limit': batch_size}
+                ).scalars().all()
+                if not ids:
+                    break
+                indexed += max(self._update(session, table, prompt, answer, ids, only_missing=True).rowcount, 0)
+                session.commit()
+                after = ids[-1]
+        return indexed
+
+
+_indexes = {}
+
+
+def get_history_index(engine):
+    """The history index for this engine's dialect, or None when full-text search is unsupported"""
+    dialect = engine.dialect.name
+    if dialect not in _indexes:
+        if dialect == 'sqlite':
+            _indexes[dialect] = SQLiteHistoryIndex()
+        elif dialect == 'postgresql':
+            _indexes[dialect] = PostgresHistoryIndex()
+        else:
+            _indexes[dialect] = None
+    return _indexes[dialect]
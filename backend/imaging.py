@@ -0,0 +1,124 @@
+"""
+Image Processing for Lookate API
+Preprocessing and perceptual-hash dedupe for image search
+
+Phone photos are decoded, EXIF-oriented, downscaled and re-encoded
+before they are sent to the vision model. A 64-bit difference hash
+(dHash) identifies near-identical photos, such as the same landmark
+shot by many users, so a cached analysis can be reused.
+"""
+
+import io
+import tempfile
+
+from cache import make_cache_key
+
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+
+
+class InvalidImageError(ValueError):
+    """Raised when the uploaded bytes are not a decodable image"""
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when a streamed upload exceeds the configured size limit"""
+
+
+def spool_stream(stream, max_bytes, memory_limit=1024 * 1024, chunk_size=64 * 1024):
+    """Copy a request body stream into a spooled temp file, enforcing max_bytes
+
+    Small uploads stay in memory; larger ones roll over to disk, so peak
+    memory per request is bounded by memory_limit rather than the upload size.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=memory_limit)
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            spooled.close()
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def decode_image(source):
+    """Decode image bytes or a binary file object and apply the EXIF orientation"""
+    from PIL import Image, ImageOps  # Pillow is imported on first use to keep app import fast
+    try:
+        image = Image.open(source if hasattr(source, 'read') else io.BytesIO(source))
+        image.load()
+    except Exception:
+        raise InvalidImageError('Invalid image data')
+    return ImageOps.exif_transpose(image)
+
+
+def preprocess_image(image, max_edge=1024, quality=80):
+    """Downscale to max_edge on the longest side and re-encode as an optimized JPEG"""
+    from PIL import Image
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if max(image.size) > max_edge:
+        image = image.copy()
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: robust to rescaling, recompression and small edits"""
+    from PIL import Image
+    pixels = list(image.convert('L').resize((size + 1, size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class ImageAnalysisCache:
+    """Reuse analyses for perceptually similar images
+
+    An analysis is stored under its exact hash. The hash is also indexed
+    by each of its four 16-bit bands: any hash within 3 bits of it shares
+    at least one band, so near-duplicates are found with four lookups.
+    """
+
+    def __init__(self, cache, max_distance=3):
+        self.cache = cache
+        self.max_distance = min(max_distance, HASH_BANDS - 1)
+
+    def _bands(self, phash):
+        mask = (1 << BAND_BITS) - 1
+        return [(phash >> (i * BAND_BITS)) & mask for i in range(HASH_BANDS)]
+
+    def get(self, phash, *context):
+        """Return a cached analysis for this or a near-identical image, or None"""
+        exact = self.cache.get(make_cache_key('image', phash, *context))
+        if exact is not None or self.max_distance == 0:
+            return exact
+        for band, value in enumerate(self._bands(phash)):
+            for candidate in self.cache.backend.get(make_cache_key('image-band', band, value, *context)) or []:
+                if candidate != phash and hamming(candidate, phash) <= self.max_distance:
+                    analysis = self.cache.backend.get(make_cache_key('image', candidate, *context))
+                    if analysis is not None:
+                        return analysis
+        return None
+
+    def set(self, phash, analysis, *context):
+        self.cache.set(make_cache_key('image', phash, *context), analysis)
+        for band, value in enumerate(self._bands(phash)):
+            key = make_cache_key('image-band', band, value, *context)
+            candidates = self.cache.backend.get(key) or []
+            if phash not in candidates:
+                self.cache.set(key, (candidates + [phash])[-32:])
@@ -0,0 +1,275 @@
+"""
+Metrics for Lookate API
+In-process counters and histograms rendered in Prometheus text format
+
+Tracked per process:
+- request latency per route, and database queries/time per request
+- upstream latency and errors per provider (OpenAI, Places, Geocoding)
+- latency of every SQL statement, via SQLAlchemy engine events
+
+Each request also collects a per-phase breakdown (database, each
+upstream) in a thread-local timer, which the slow-request log prints.
+With several gunicorn workers each worker exposes its own series; have
+Prometheus scrape every worker, or aggregate with sum() over instances.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+        name = f'{name}{{{pairs}}}'
+    if isinstance(value, float):
+        if math.isinf(value):
+            value = '+Inf' if value > 0 else '-Inf'
+        else:
+            value = repr(value)
+    return f'{name} {value}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(series[0]), series[1], series[2]) for key, series in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = '+Inf' if math.isinf(bound) else repr(float(bound))
+                yield f'{self.name}_bucket', labels + [('le', le)], cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class RequestTimer:
+    """Per-request totals: database queries/time and seconds spent in each phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.phases = defaultdict(float)
+        self.active = set()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_timer():
+    """The RequestTimer of the request running on this thread, or None"""
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def phase(name):
+    """Add the enclosed block's duration to the current request's breakdown
+
+    Nested phases with the same name are only counted once, so a helper
+    that tracks its own upstream calls can also be wrapped by its caller.
+    """
+    timer = current_timer()
+    if timer is None or name in timer.active:
+        yield
+        return
+    timer.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.active.discard(name)
+        timer.phases[name] += time.perf_counter() - start
+
+
+class Metrics:
+    """Lookate's metrics registry plus the request, upstream and SQL instrumentation"""
+
+    def __init__(self, slow_request_threshold=1.0):
+        self.slow_request_threshold = slow_request_threshold
+        self._metrics = []
+        self._collectors = []
+
+        self.request_latency = self.histogram(
+            'lookate_request_duration_seconds', 'Request latency by route', ('method', 'route'))
+        self.requests = self.counter(
+            'lookate_requests_total', 'Requests by route and status code', ('method', 'route', 'status'))
+        self.request_db_queries = self.histogram(
+            'lookate_request_db_queries', 'SQL statements executed per request', ('route',),
+            buckets=QUERY_COUNT_BUCKETS)
+        self.request_db_seconds = self.histogram(
+            'lookate_request_db_seconds', 'Time spent in SQL per request', ('route',))
+        self.db_query_latency = self.histogram(
+            'lookate_db_query_duration_seconds', 'Latency of individual SQL statements')
+        self.upstream_latency = self.histogram(
+            'lookate_upstream_request_duration_seconds', 'Upstream call latency by provider', ('upstream',))
+        self.upstream_errors = self.counter(
+            'lookate_upstream_errors_total', 'Failed upstream calls by provider and error type',
+            ('upstream', 'error'))
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """Add a callback returning (name, type, documentation, [(labels, value)]) tuples at scrape time"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(_format_sample(name, labels, value) for name, labels, value in metric.samples())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                logger.exception("Metrics collector failed")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(_format_sample(name, sorted(labels.items()), value) for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    def phase(self, name):
+        """Time a block of the current request under its own name in the breakdown"""
+        return phase(name)
+
+    @contextmanager
+    def track_upstream(self, upstream):
+        """Time an upstream call, count its failures and add it to the request breakdown"""
+        start = time.perf_counter()
+        try:
+            with phase(upstream):
+                yield
+        except Exception as e:
+            self.upstream_errors.inc(upstream=upstream, error=type(e).__name__)
+            raise
+        finally:
+            self.upstream_latency.observe(time.perf_counter() - start, upstream=upstream)
+
+    def start_request(self):
+        _local.timer = RequestTimer()
+
+    def finish_request(self, method, route, status, path=None):
+        """Record the request's metrics and log it if it was slow"""
+        timer = current_timer()
+        _local.timer = None
+        if timer is None:
+            return
+        elapsed = timer.elapsed()
+        self.request_latency.observe(elapsed, method=method, route=route)
+        self.requests.inc(method=method, route=route, status=str(status))
+        self.request_db_queries.observe(timer.db_queries, route=route)
+        self.request_db_seconds.observe(timer.db_seconds, route=route)
+        if self.slow_request_threshold and elapsed >= self.slow_request_threshold:
+            phases = ' '.join(f'{name}={seconds * 1000:.0f}ms' for name, seconds in sorted(timer.phases.items()))
+            logger.warning(
+                "Slow request: %s %s -> %s in %.0fms (db: %d queries, %.0fms%s)",
+                method, path or route, status, elapsed * 1000, timer.db_queries,
+                timer.db_seconds * 1000, f'; {phases}' if phases else ''
+            )
+
+    def instrument_sqlalchemy(self):
+        """Time every SQL statement on every engine, attributing it to the current request"""
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('lookate_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._finish_query(conn)
+
+    def _handle_error(self, exception_context):
+        if exception_context.connection is not None:
+            self._finish_query(exception_context.connection)
+
+    def _finish_query(self, conn):
+        starts = conn.info.get('lookate_query_start')
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        self.db_query_latency.observe(seconds)
+        timer = current_timer()
+        if timer is not None:
+            timer.db_queries += 1
+            timer.db_seconds += seconds
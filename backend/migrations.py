@@ -0,0 +1,187 @@
+"""
+Schema Migrations for Lookate API
+Lightweight, versioned migration runner
+
+Applied versions are recorded in the schema_migrations table. Each
+migration is idempotent (it checks the live schema before changing it),
+so databases created by older db.create_all() calls upgrade cleanly.
+On PostgreSQL indexes are built with CREATE INDEX CONCURRENTLY so they
+can be added to a live database without blocking writes.
+
+Run with: flask --app app db-upgrade
+"""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function taking (engine, metadata)"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _columns(engine, table):
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def _indexes(engine, table):
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+
+def add_column(engine, table, name, ddl_type):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    if name in _columns(engine, table):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {name} {ddl_type}'))
+
+
+def create_index(engine, name, table, columns, unique=False, using=None):
+    """Create an index, concurrently on PostgreSQL, unless it already exists"""
+    if name in _indexes(engine, table):
+        return
+    unique_sql = 'UNIQUE ' if unique else ''
+    column_sql = ', '.join(columns)
+    if engine.dialect.name == 'postgresql':
+        using_sql = f'USING {using} ' if using else ''
+        # CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(
+                f'CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" {using_sql}({column_sql})'
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON "{table}" ({column_sql})'))
+
+
+@migration(1, 'initial schema')
+def create_missing_tables(engine, metadata):
+    metadata.create_all(bind=engine, checkfirst=True)
+
+
+@migration(2, 'task geocoding state and geohash cell')
+def add_task_geocoding_columns(engine, metadata):
+    add_column(engine, 'task', 'geocode_status', 'VARCHAR(20)')
+    add_column(engine, 'task', 'geohash', 'VARCHAR(12)')
+    create_index(engine, 'ix_task_user_geohash', 'task', ['user_id', 'geohash'])
+
+
+@migration(3, 'composite indexes for per-user history and task queries')
+def add_user_composite_indexes(engine, metadata):
+    create_index(engine, 'ix_chat_message_user_created', 'chat_message', ['user_id', 'created_at'])
+    create_index(engine, 'ix_search_user_created', 'search', ['user_id', 'created_at'])
+    create_index(engine, 'ix_task_user_created', 'task', ['user_id', 'created_at'])
+    create_index(engine, 'ix_task_user_completed', 'task', ['user_id', 'completed'])
+
+
+@migration(4, 'incrementally maintained per-user statistics')
+def add_user_stats_table(engine, metadata):
+    # Counters for existing users are filled lazily or by: flask --app app reconcile-stats
+    metadata.create_all(bind=engine, tables=[metadata.tables['user_stats']], checkfirst=True)
+
+
+@migration(5, 'task sync versions for delta sync and conditional GETs')
+def add_task_sync_columns(engine, metadata):
+    add_column(engine, 'task', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(engine, 'task', 'updated_at', 'TIMESTAMP')
+    add_column(engine, 'user_stats', 'tasks_version', 'INTEGER NOT NULL DEFAULT 0')
+    create_index(engine, 'ix_task_user_version', 'task', ['user_id', 'version'])
+
+
+@migration(6, 'pre-assigned ID blocks for write-behind search and chat logs')
+def add_id_allocation_table(engine, metadata):
+    # Blocks start above the current MAX(id) of each table on first use
+    metadata.create_all(bind=engine, tables=[metadata.tables['id_allocation']], checkfirst=True)
+
+
+@migration(7, 'full-text index over search and chat history')
+def add_history_search_index(engine, metadata):
+    # Existing rows are indexed by: flask --app app backfill-history
+    if engine.dialect.name == 'postgresql':
+        for table in ('search', 'chat_message'):
+            add_column(engine, table, 'search_vector', 'TSVECTOR')
+            create_index(engine, f'ix_{table}_search_vector', table, ['search_vector'], using='gin')
+    elif engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5('
+                "prompt, answer, owner, created_at UNINDEXED, tokenize='porter unicode61')"
+            ))
+
+
+@migration(8, 'search log index for the autocomplete refresher')
+def add_search_created_index(engine, metadata):
+    create_index(engine, 'ix_search_created', 'search', ['created_at'])
+
+
+@migration(9, 'sync versions for tasks created before delta sync')
+def number_unversioned_tasks(engine, metadata, batch_size=1000):
+    # Migration 5 left existing tasks at version 0, which /tasks/sync?since=0 never returns.
+    # Give them versions above each user's current one, oldest first, and move tasks_version up to match.
+    with engine.begin() as conn:
+        next_version = dict(conn.execute(text(
+            'SELECT user_id, MAX(version) FROM task GROUP BY user_id'
+        )).all())
+        for user_id, tasks_version in conn.execute(text('SELECT user_id, tasks_version FROM user_stats')):
+            if user_id in next_version:
+                next_version[user_id] = max(next_version[user_id] or 0, tasks_version or 0)
+
+        unversioned = conn.execute(text('SELECT id, user_id FROM task WHERE version = 0 ORDER BY user_id, id')).all()
+        updates = []
+        for task_id, user_id in unversioned:
+            next_version[user_id] = (next_version[user_id] or 0) + 1
+            updates.append({'id': task_id, 'version': next_version[user_id]})
+        for start in range(0, len(updates), batch_size):
+            conn.execute(text('UPDATE task SET version = :version WHERE id = :id'), updates[start:start + batch_size])
+
+        conn.execute(text(
+            'UPDATE user_stats SET tasks_version = '
+            '(SELECT MAX(version) FROM task WHERE task.user_id = user_stats.user_id) '
+            'WHERE tasks_version < (SELECT MAX(version) FROM task WHERE task.user_id = user_stats.user_id)'
+        ))
+
+
+@migration(10, 'saved chat summaries shared by all workers')
+def add_chat_summary_table(engine, metadata):
+    metadata.create_all(bind=engine, tables=[metadata.tables['chat_summary']], checkfirst=True)
+
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200) NOT NULL, '
+            'applied_at TIMESTAMP NOT NULL)'
+        ))
+
+
+def current_version(engine):
+    """Return the highest applied migration version (0 for a new database)"""
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return conn.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar() or 0
+
+
+def upgrade(engine, metadata, target=None):
+    """Apply pending migrations in order; returns the versions applied"""
+    applied = []
+    version = current_version(engine)
+    for number, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if number <= version or (target is not None and number > target):
+            continue
+        fn(engine, metadata)
+        with engine.begin() as conn:
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': number, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(number)
+    return applied
@@ -0,0 +1,143 @@
+"""
+Places Tile Cache for Lookate API
+Serves Google Places Nearby Search from cached geohash tiles
+
+Requests are mapped onto fixed geohash tiles. Each (tile, type) pair is
+fetched once with a circle enclosing the tile and cached with a TTL, so
+nearby users panning the same map share upstream calls. A request that
+spans several tiles is answered by merging the tiles and filtering by
+exact distance; only the missing tiles are fetched.
+
+Each call returns at most 20 places, so a tile fetched over a circle
+much larger than the request would leave few of them inside the radius.
+Tiles are therefore the coarsest whose enclosing circle is at most
+MAX_TILE_OVERSCAN times the requested radius, which keeps results as
+complete as one direct call at the cost of a few more calls when cold.
+Places rejects radii over 50 km, which rules out precision 3. A request
+with no fitting precision, or that would need more than max_tiles tiles,
+is sent upstream directly, uncached, as one call.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import make_cache_key
+from spatial import cell_center_and_radius, cells_in_radius, haversine_m
+
+TILE_PRECISIONS = (4, 5, 6, 7)  # coarsest first
+MAX_FETCH_RADIUS = 50000  # Places Nearby Search limit, in meters
+MAX_TILE_OVERSCAN = 1.25  # enclosing tile radius / request radius
+
+
+class PlacesTileCache:
+    """Tile-level cache in front of a Places Nearby Search fetcher
+
+    ``fetch_tile(latitude, longitude, radius, place_type)`` must return a
+    list of place dicts with a ``location`` of ``{'lat', 'lng'}``, or None
+    when the upstream response should not be cached.
+    """
+
+    def __init__(self, cache, fetch_tile, max_tiles=16, max_workers=8):
+        self.cache = cache
+        self.fetch_tile = fetch_tile
+        self.max_tiles = max_tiles
+        self.max_workers = max_workers
+        self.requests = 0
+        self.tile_hits = 0
+        self.tile_misses = 0
+        self.direct_calls = 0
+        self._lock = threading.Lock()
+
+    def tiles_for(self, latitude, longitude, radius):
+        """Pick the coarsest tiles about as wide as the radius; None when no precision fits within max_tiles"""
+        for precision in TILE_PRECISIONS:
+            tiles = cells_in_radius(latitude, longitude, radius, precision)
+            tile_radius = cell_center_and_radius(tiles[0])[2]
+            if tile_radius <= MAX_FETCH_RADIUS and tile_radius <= radius * MAX_TILE_OVERSCAN:
+                return tiles if len(tiles) <= self.max_tiles else None
+        return None
+
+    def nearby(self, latitude, longitude, radius, place_type=''):
+        """Return (places ordered by distance, per-request cache info)"""
+        tiles = self.tiles_for(latitude, longitude, radius)
+        if tiles is None:
+            places = self.fetch_tile(latitude, longitude, min(int(radius), MAX_FETCH_RADIUS), place_type) or []
+            with self._lock:
+                self.requests += 1
+                self.direct_calls += 1
+            return self._within(latitude, longitude, radius, places), {
+                'tiles': 0,
+                'tiles_cached': 0,
+                'upstream_calls': 1
+            }
+
+        tile_places = {}
+        missing = []
+        for tile in tiles:
+            cached = self.cache.get(make_cache_key('places', tile, place_type))
+            if cached is None:
+                missing.append(tile)
+            else:
+                tile_places[tile] = cached
+
+        if len(missing) == 1:
+            tile_places[missing[0]] = self._fetch(missing[0], place_type) or []
+        elif missing:
+            workers = min(self.max_workers, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = executor.map(lambda tile: self._fetch(tile, place_type), missing)
+                for tile, places in zip(missing, fetched):
+                    tile_places[tile] = places or []
+
+        with self._lock:
+            self.requests += 1
+            self.tile_hits += len(tiles) - len(missing)
+            self.tile_misses += len(missing)
+
+        merged = {}
+        for places in tile_places.values():
+            for place in places:
+                merged.setdefault(place.get('place_id'), place)
+
+        return self._within(latitude, longitude, radius, list(merged.values())), {
+            'tiles': len(tiles),
+            'tiles_cached': len(tiles) - len(missing),
+            'upstream_calls': len(missing)
+        }
+
+    def _within(self, latitude, longitude, radius, places):
+        """Places inside the radius, nearest first, with their distance in meters"""
+        places = [place for place in places if place.get('location')]
+        result = []
+        if places:
+            distances = haversine_m(
+                latitude,
+                longitude,
+                [place['location']['lat'] for place in places],
+                [place['location']['lng'] for place in places]
+            )
+            for i in distances.argsort():
+                if distances[i] <= radius:
+                    result.append(dict(places[i], distance=round(float(distances[i]), 1)))
+        return result
+
+    def _fetch(self, tile, place_type):
+        center_lat, center_lng, radius = cell_center_and_radius(tile)
+        places = self.fetch_tile(center_lat, center_lng, min(int(radius) + 1, MAX_FETCH_RADIUS), place_type)
+        if places is not None:
+            self.cache.set(make_cache_key('places', tile, place_type), places)
+        return places
+
+    def stats(self):
+        """Return the tile hit ratio, upstream calls made and calls saved by cached tiles"""
+        with self._lock:
+            total = self.tile_hits + self.tile_misses
+            return {
+                'requests': self.requests,
+                'tile_hits': self.tile_hits,
+                'tile_misses': self.tile_misses,
+                'hit_ratio': (self.tile_hits / total) if total else 0.0,
+                'direct_calls': self.direct_calls,
+                'upstream_calls': self.tile_misses + self.direct_calls,
+                'upstream_calls_saved': self.tile_hits
+            }
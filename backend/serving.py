@@ -0,0 +1,73 @@
+"""
+Serving Modes for Lookate API
+Sync (one request per worker) or async (event-loop worker) deployment
+
+In async mode gunicorn runs gevent workers: every socket call made by
+requests, the OpenAI SDK, redis and the upstream clients yields to the
+event loop, so hundreds of in-flight AI and Maps calls share one process
+without changing any route or the JWT auth. Database concurrency is
+bounded by the SQLAlchemy connection pool. On PostgreSQL, psycopg2 is
+made cooperative through psycogreen; async mode refuses to start without
+it, since every query would otherwise block the whole worker.
+"""
+
+import os
+
+SYNC = 'sync'
+ASYNC = 'async'
+
+SERVING_MODE = os.environ.get('LOOKATE_SERVING_MODE', SYNC).lower()
+
+
+def is_async():
+    return SERVING_MODE == ASYNC
+
+
+def engine_options():
+    """SQLAlchemy engine options bounding concurrent DB work per worker"""
+    if not is_async():
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_pre_ping': True
+    }
+
+
+def make_cooperative_db_driver(database_url):
+    """Let psycopg2 wait on the event loop instead of blocking the worker
+
+    Returns False for databases that need no patching (SQLite). Raises
+    RuntimeError when PostgreSQL is configured but psycogreen is missing.
+    """
+    if not database_url.startswith(('postgres://', 'postgresql')):
+        return False
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        raise RuntimeError(
+            'LOOKATE_SERVING_MODE=async on PostgreSQL needs psycogreen (pip install psycogreen); '
+            'without it every query blocks the whole worker'
+        )
+    patch_psycopg()
+    return True
+
+
+def configure_openai(openai_module):
+    """Share one keep-alive pool across greenlets for OpenAI calls
+
+    The OpenAI SDK keeps a session per thread; under gevent every
+    greenlet counts as a thread, which would mean a TLS handshake per
+    request. Sessions are thread-safe for this use, so share one.
+    """
+    if not is_async():
+        return
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=int(os.environ.get('OPENAI_POOL_SIZE', 100)))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    openai_module.requestssession = session
@@ -0,0 +1,130 @@
+"""
+Spatial Helpers for Lookate API
+Geohash cell encoding, covering-cell computation and vectorized distance math
+
+Geohashes are stored alongside coordinates so "near me" queries can be
+prefiltered with an index range scan on (user_id, geohash) before exact
+haversine filtering.
+"""
+
+import math
+
+EARTH_RADIUS_M = 6371008.8
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells for stored values
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode coordinates as a geohash string of the given precision"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_bbox(cell):
+    """Decode a geohash into its (lat_min, lat_max, lng_min, lng_max) bounds"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def cell_size_degrees(precision):
+    """Return (lat_degrees, lng_degrees) spanned by a geohash cell"""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def _meters_per_degree(latitude):
+    lat_m = math.pi * EARTH_RADIUS_M / 180.0
+    lng_m = lat_m * max(math.cos(math.radians(latitude)), 1e-6)
+    return lat_m, lng_m
+
+
+def covering_cells(latitude, longitude, radius_m):
+    """Return geohash prefixes that together cover a circle of radius_m
+
+    The precision is the finest one whose cells are still at least as
+    large as the radius, so the circle touches at most a 3x3 block.
+    """
+    lat_m, lng_m = _meters_per_degree(latitude)
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = cell_size_degrees(p)
+        if cell_lat * lat_m >= radius_m and cell_lng * lng_m >= radius_m:
+            precision = p
+            break
+    return cells_in_radius(latitude, longitude, radius_m, precision)
+
+
+def cells_in_radius(latitude, longitude, radius_m, precision):
+    """Return every geohash cell of the given precision touching the circle's bounding box"""
+    lat_m, lng_m = _meters_per_degree(latitude)
+    cell_lat, cell_lng = cell_size_degrees(precision)
+    dlat = radius_m / lat_m
+    dlng = min(radius_m / lng_m, 180.0)
+    cells = set()
+    lat = max(latitude - dlat, -90.0)
+    while True:
+        lng = longitude - dlng
+        while True:
+            wrapped = (lng + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(min(lat, 90.0 - 1e-9), wrapped, precision))
+            if lng >= longitude + dlng:
+                break
+            lng = min(lng + cell_lng, longitude + dlng)
+        if lat >= min(latitude + dlat, 90.0):
+            break
+        lat = min(lat + cell_lat, latitude + dlat, 90.0)
+    return sorted(cells)
+
+
+def cell_center_and_radius(cell):
+    """Return the center of a cell and the radius in meters of a circle enclosing it"""
+    lat_min, lat_max, lng_min, lng_max = geohash_bbox(cell)
+    center_lat = (lat_min + lat_max) / 2
+    center_lng = (lng_min + lng_max) / 2
+    radius = haversine_m(center_lat, center_lng, [lat_max], [lng_max])[0]
+    return center_lat, center_lng, float(radius)
+
+
+def haversine_m(latitude, longitude, latitudes, longitudes):
+    """Vectorized great-circle distance in meters from one point to many"""
+    import numpy as np  # imported on first use to keep app import fast
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(longitudes, dtype=float) - longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,259 @@
+"""
+Search Suggestions for Lookate API
+Popularity-ranked prefix autocomplete built from the search log
+
+Text and voice queries are aggregated by normalized text. Popularity
+decays exponentially (half-life in hours); it is kept with forward
+decay, so a new search only adds to a running total. A query is only
+suggested to other users once enough distinct users have searched it.
+
+Each process tracks at most max_entries eligible queries plus as many
+still short of min_users, and drops queries whose decayed popularity is
+negligible, so memory stays bounded however many distinct queries come in.
+
+The most popular queries are kept in a sorted array. A prefix maps to a
+contiguous range found by binary search, and a sparse table answers
+range-maximum queries in O(1), so the top k of any range comes out of a
+small heap in O(log n + k log k), however many queries share the prefix.
+
+A background thread in each process reads new search rows every refresh
+interval and swaps in a rebuilt array. The user's own recent queries are
+blended in at lookup time.
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from cache import LRUBackend, normalize_query
+
+logger = logging.getLogger(__name__)
+
+PERSONAL_WEIGHT = 2.0
+MAX_QUERY_LENGTH = 100
+USER_HISTORY_SIZE = 200
+USER_CACHE_ENTRIES = 10000
+USER_CACHE_TTL = 15 * 60
+# Write-behind rows can land after rows created later; re-read this far back and skip IDs already counted
+LATE_ROW_SECONDS = 300
+# Tracked queries whose decayed weight falls below this (one search two half-lives ago) are dropped
+MIN_TRACKED_WEIGHT = 0.25
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _epoch(created_at):
+    """Seconds since the epoch for a naive UTC datetime"""
+    return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def normalize_prefix(prefix):
+    """Like normalize_query, but keeps a trailing space so 'coffee ' only completes whole words"""
+    return _WHITESPACE_RE.sub(' ', (prefix or '').lstrip().lower())[:MAX_QUERY_LENGTH]
+
+
+class PrefixIndex:
+    """Immutable sorted array of (text, weight) with O(1) range-maximum queries"""
+
+    def __init__(self, entries, reference):
+        import numpy as np  # imported on first use to keep app import fast
+
+        entries = sorted(entries)
+        self.reference = reference
+        self.keys = [text for text, _ in entries]
+        self.weights = np.array([weight for _, weight in entries], dtype=np.float64)
+
+        # _table[j][i] is the position of the largest weight in keys[i:i + 2**j]
+        n = len(self.keys)
+        self._table = [np.arange(n, dtype=np.int32)]
+        half = 1
+        while half * 2 <= n:
+            previous = self._table[-1]
+            left = previous[:n - 2 * half + 1]
+            right = previous[half:n - half + 1]
+            self._table.append(np.where(self.weights[left] >= self.weights[right], left, right))
+            half *= 2
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _argmax(self, lo, hi):
+        level = (hi - lo).bit_length() - 1
+        a = self._table[level][lo]
+        b = self._table[level][hi - (1 << level)]
+        return int(a) if self.weights[a] >= self.weights[b] else int(b)
+
+    def top(self, prefix, k):
+        """The k heaviest (text, weight) pairs starting with prefix, heaviest first"""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        results = []
+        heap = []
+        if lo < hi:
+            best = self._argmax(lo, hi)
+            heap.append((-self.weights[best], best, lo, hi))
+        while heap and len(results) < k:
+            _, best, lo, hi = heapq.heappop(heap)
+            results.append((self.keys[best], float(self.weights[best])))
+            for sub_lo, sub_hi in ((lo, best), (best + 1, hi)):
+                if sub_lo < sub_hi:
+                    sub_best = self._argmax(sub_lo, sub_hi)
+                    heapq.heappush(heap, (-self.weights[sub_best], sub_best, sub_lo, sub_hi))
+        return results
+
+
+class QuerySuggester:
+    """Autocomplete from the search log, blended with each user's own recent searches
+
+    ``load_rows(since)`` returns (id, user_id, query, created_at) rows of
+    searches created at or after ``since``. ``load_user_rows(user_id, limit)``
+    returns a user's most recent (query, created_at) pairs. Both are called
+    inside an application context.
+    """
+
+    def __init__(self, app, load_rows, load_user_rows, half_life_hours=72, min_users=3,
+                 max_entries=100000, refresh_interval=60):
+        self.app = app
+        self.load_rows = load_rows
+        self.load_user_rows = load_user_rows
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.half_life = half_life_hours * 3600
+        self.min_users = min_users
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self._index = None
+        self._users = LRUBackend(max_entries=USER_CACHE_ENTRIES)
+        self._reset(time.time())
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _reset(self, now):
+        self._reference = now
+        self._popularity = {}  # text -> [forward-decayed weight, set of up to min_users user IDs]
+        self._counted = {}  # search ID -> created timestamp, for rows inside the late-row window
+        self._watermark = None
+
+    def refresh(self):
+        """Fold new search rows into the popularity totals and swap in a rebuilt index"""
+        with self._refresh_lock:
+            now = time.time()
+            # Forward-decayed weights grow with time; start over once per half-life to keep them small
+            if self._watermark is None or now - self._reference > self.half_life:
+                self._reset(now)
+                since = now - 4 * self.half_life
+            else:
+                since = self._watermark - LATE_ROW_SECONDS
+
+            for row_id, user_id, query, created_at in self.load_rows(datetime.utcfromtimestamp(since)):
+                if row_id in self._counted:
+                    continue
+                created = _epoch(created_at)
+                self._counted[row_id] = created
+                self._watermark = max(self._watermark or created, created)
+                text = normalize_query(query)[:MAX_QUERY_LENGTH]
+                if not text:
+                    continue
+                entry = self._popularity.setdefault(text, [0.0, set()])
+                entry[0] += math.exp(self.decay_rate * (created - self._reference))
+                if len(entry[1]) < self.min_users:
+                    entry[1].add(user_id)
+            if self._watermark is None:
+                self._watermark = now
+            cutoff = self._watermark - LATE_ROW_SECONDS
+            self._counted = {row_id: created for row_id, created in self._counted.items() if created >= cutoff}
+
+            eligible = self._prune(now)
+            self._index = PrefixIndex(eligible, self._reference)
+            return len(self._index)
+
+    def _prune(self, now):
+        """Bound the tracked queries; returns the (text, weight) pairs to index
+
+        Keeps the max_entries heaviest eligible queries and as many of the
+        heaviest still short of min_users, dropping any whose decayed weight
+        is negligible.
+        """
+        floor = MIN_TRACKED_WEIGHT * math.exp(self.decay_rate * (now - self._reference))
+        eligible = []
+        pending = []
+        for text, entry in self._popularity.items():
+            if entry[0] >= floor:
+                (eligible if len(entry[1]) >= self.min_users else pending).append((text, entry))
+        eligible = heapq.nlargest(self.max_entries, eligible, key=lambda item: item[1][0])
+        pending = heapq.nlargest(self.max_entries, pending, key=lambda item: item[1][0])
+        self._popularity = dict(eligible + pending)
+        return [(text, entry[0]) for text, entry in eligible]
+
+    def _ensure_thread(self):
+        # Started lazily, per process, so an index built before fork keeps refreshing in each worker
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='lookate-suggest', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if self._index is not None:
+                time.sleep(self.refresh_interval)
+            with self.app.app_context():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Suggestion index refresh failed")
+                    time.sleep(self.refresh_interval)
+
+    def _user_history(self, user_id):
+        history = self._users.get(user_id)
+        if history is None:
+            history = [(normalize_query(query)[:MAX_QUERY_LENGTH], _epoch(created_at))
+                       for query, created_at in self.load_user_rows(user_id, USER_HISTORY_SIZE)]
+            self._users.set(user_id, history, ttl=USER_CACHE_TTL)
+        return history
+
+    def record(self, user_id, query):
+        """Make a search count towards the user's own suggestions at once"""
+        history = self._users.get(user_id)
+        text = normalize_query(query)[:MAX_QUERY_LENGTH]
+        if history is not None and text:
+            history.insert(0, (text, time.time()))
+            del history[USER_HISTORY_SIZE:]
+
+    def suggest(self, user_id, prefix, limit=5):
+        """Completions of prefix as [{'text', 'personal'}], best first"""
+        self._ensure_thread()
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        now = time.time()
+
+        scores = {}
+        index = self._index
+        if index is not None:
+            decay = math.exp(-self.decay_rate * (now - index.reference))
+            for text, weight in index.top(prefix, limit * 2):
+                scores[text] = math.log1p(weight * decay)
+
+        personal = {}
+        for text, created in self._user_history(user_id):
+            if text.startswith(prefix):
+                personal[text] = personal.get(text, 0.0) + math.exp(-self.decay_rate * (now - created))
+        for text, weight in personal.items():
+            scores[text] = scores.get(text, 0.0) + PERSONAL_WEIGHT * math.log1p(weight)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'text': text, 'personal': text in personal} for text, _ in ranked]
+
+    def stats(self):
+        index = self._index
+        return {'entries': len(index) if index is not None else 0, 'tracked': len(self._popularity)}
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as lookate  # noqa: E402
+from config import TestingConfig, config  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build a testing app on a scratch SQLite database, with config overrides"""
+    apps = []
+
+    def build(**overrides):
+        overrides.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'lookate.db'}")
+        overrides.setdefault('REDIS_URL', None)
+        monkeypatch.setitem(config, 'pytest', type('PytestConfig', (TestingConfig,), overrides))
+        app = lookate.create_app('pytest')
+        with app.app_context():
+            lookate.db.create_all()
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        with app.app_context():
+            lookate.db.session.remove()
+            lookate.db.engine.dispose()
+
+
+def auth_headers(client, email='a@example.com'):
+    response = client.post('/auth/register', json={'email': email, 'password': 'secret', 'name': 'A'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
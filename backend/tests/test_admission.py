@@ -0,0 +1,69 @@
+"""Admission control: per-user AI rate limits also hold for /batch sub-requests, and anonymous callers are keyed by client"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import app as lookate
+from conftest import auth_headers
+
+
+@pytest.fixture
+def client(make_app):
+    return make_app(ADMISSION_ENABLED=True, ADMISSION_AI_RATE=2, ADMISSION_AI_BURST=2).test_client()
+
+
+@pytest.fixture
+def openai_calls(monkeypatch):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='answer'))])
+
+    fake = SimpleNamespace(ChatCompletion=SimpleNamespace(create=create))
+    monkeypatch.setattr(lookate, 'get_openai', lambda: fake)
+    return calls
+
+
+def test_direct_text_search_is_rate_limited(client, openai_calls):
+    headers = auth_headers(client)
+    statuses = [client.post('/search/text', json={'query': f'coffee {i}'}, headers=headers).status_code
+                for i in range(3)]
+    assert statuses == [200, 200, 429]
+    assert len(openai_calls) == 2
+
+
+def test_batch_sub_requests_share_the_rate_limit(client, openai_calls):
+    headers = auth_headers(client)
+    items = [{'method': 'POST', 'path': '/search/text', 'body': {'query': f'coffee {i}'}} for i in range(20)]
+    responses = client.post('/batch', json={'requests': items}, headers=headers).get_json()['responses']
+
+    statuses = [item['status'] for item in responses]
+    assert statuses[:2] == [200, 200]
+    assert set(statuses[2:]) == {429}
+    assert all('Retry-After' in item['headers'] for item in responses[2:])
+    assert len(openai_calls) == 2
+
+    # The bucket is shared with direct calls
+    assert client.post('/search/text', json={'query': 'tea'}, headers=headers).status_code == 429
+
+
+def test_login_is_limited_per_email(make_app):
+    client = make_app(ADMISSION_ENABLED=True, ADMISSION_STANDARD_RATE=2,
+                      ADMISSION_STANDARD_BURST=2).test_client()
+    statuses = [client.post('/auth/login', json={'email': 'a@example.com', 'password': 'x'}).status_code
+                for _ in range(3)]
+    assert statuses[2] == 429
+
+    # Another account behind the same address still gets through
+    assert client.post('/auth/login', json={'email': 'b@example.com', 'password': 'x'}).status_code != 429
+
+
+def test_client_address_from_trusted_proxy(make_app):
+    client = make_app(ADMISSION_ENABLED=True, ADMISSION_STANDARD_RATE=1, ADMISSION_STANDARD_BURST=1,
+                      TRUSTED_PROXY_COUNT=1).test_client()
+    first = {'X-Forwarded-For': '203.0.113.1'}
+    assert client.get('/tasks', headers=first).status_code != 429
+    assert client.get('/tasks', headers=first).status_code == 429
+    assert client.get('/tasks', headers={'X-Forwarded-For': '203.0.113.2'}).status_code != 429
@@ -0,0 +1,55 @@
+"""Task geocoding: upstream outages leave tasks pending for a retry; only unknown addresses fail"""
+
+import pytest
+
+import app as lookate
+from conftest import auth_headers
+from upstream import CircuitOpenError
+
+
+class FakeGeocoder:
+    def __init__(self):
+        self.response = None
+
+    def get_json(self, url, params=None):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def geocoder(app, monkeypatch):
+    # After make_app, which creates the real client
+    fake = FakeGeocoder()
+    monkeypatch.setattr(lookate, 'geocoding_client', fake)
+    return fake
+
+
+def create_task(client, headers, location):
+    return client.post('/tasks', json={'title': 'errand', 'location': location}, headers=headers).get_json()['task']
+
+
+def test_outage_keeps_task_pending_until_retried(app, geocoder):
+    client = app.test_client()
+    headers = auth_headers(client)
+
+    geocoder.response = CircuitOpenError('geocoding', 'circuit open')
+    assert create_task(client, headers, 'Pike Place Market')['geocode_status'] == 'pending'
+    geocoder.response = {'status': 'OVER_QUERY_LIMIT', 'results': []}
+    assert create_task(client, headers, 'Space Needle')['geocode_status'] == 'pending'
+
+    geocoder.response = {'status': 'OK', 'results': [{'geometry': {'location': {'lat': 47.6, 'lng': -122.3}}}]}
+    with app.app_context():
+        assert lookate.enqueue_pending_geocodes() == 2
+        assert {task.geocode_status for task in lookate.Task.query} == {'resolved'}
+
+
+def test_unknown_address_fails(app, geocoder):
+    client = app.test_client()
+    geocoder.response = {'status': 'ZERO_RESULTS', 'results': []}
+    assert create_task(client, auth_headers(client), 'nowhere at all')['geocode_status'] == 'failed'
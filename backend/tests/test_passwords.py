@@ -0,0 +1,16 @@
+"""Password hashing: stored hashes are only upgraded when the configured method changes"""
+
+import pytest
+
+from passwords import PasswordHasher
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256', 'pbkdf2:sha256:600000'])
+def test_fresh_hash_does_not_need_rehash(method):
+    hasher = PasswordHasher(method=method, workers=0)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+
+
+def test_hash_from_another_method_needs_rehash():
+    old = PasswordHasher(method='pbkdf2:sha256:1000', workers=0)
+    assert PasswordHasher(method='pbkdf2:sha256', workers=0).needs_rehash(old.hash('secret'))
@@ -0,0 +1,49 @@
+"""Task delta sync: versions stay unique per user across stats reconciliation and rejected bulk writes"""
+
+import app as lookate
+from conftest import auth_headers
+
+
+def sync_all(client, headers, since=0, limit=1):
+    """Page through /tasks/sync one task at a time; returns the versions seen"""
+    versions = []
+    while True:
+        body = client.get(f'/tasks/sync?since={since}&limit={limit}', headers=headers).get_json()
+        versions += [task['version'] for task in body['tasks']]
+        since = body['version']
+        if not body['has_more']:
+            return versions
+
+
+def test_sync_paging_after_reconcile(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = auth_headers(client)
+    for title in ('one', 'two', 'three'):
+        client.post('/tasks', json={'title': title}, headers=headers)
+
+    # A user whose counter row is missing, e.g. created before user_stats existed
+    with app.app_context():
+        lookate.UserStats.query.delete()
+        lookate.db.session.commit()
+        lookate.reconcile_user_stats()
+
+    client.post('/tasks', json={'title': 'four'}, headers=headers)
+    assert sync_all(client, headers) == [1, 2, 3, 4]
+    assert sync_all(client, headers, since=1) == [2, 3, 4]
+
+
+def test_bulk_rejects_malformed_input_without_reserving_versions(make_app):
+    app = make_app()
+    client = app.test_client()
+    headers = auth_headers(client)
+    created = client.post('/tasks/bulk', json={'tasks': [{'title': 'one'}]}, headers=headers).get_json()
+    task_id = created['tasks'][0]['id']
+
+    assert client.post('/tasks/bulk', json={'tasks': [{'title': 'two'}, 'three']}, headers=headers).status_code == 400
+    assert client.put('/tasks/bulk/toggle', json={'task_ids': [task_id], 'completed': 'false'},
+                      headers=headers).status_code == 400
+    assert client.put('/tasks/bulk/toggle', json={'task_ids': [{'id': task_id}]}, headers=headers).status_code == 400
+
+    client.post('/tasks', json={'title': 'four'}, headers=headers)
+    assert sync_all(client, headers) == [1, 2]
@@ -0,0 +1,149 @@
+"""
+Upstream HTTP Clients for Lookate API
+Pooled, bounded clients for third-party APIs (Google Maps)
+
+Each UpstreamClient owns:
+- a requests.Session with its own keep-alive connection pool
+- connect/read timeouts applied to every call
+- bounded retries with exponential backoff and full jitter
+- a circuit breaker that fails fast while the upstream is unhealthy
+- a concurrency limit so a slow upstream cannot absorb every worker thread
+"""
+
+import random
+import threading
+import time
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call fails after retries"""
+
+    def __init__(self, upstream, message):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the upstream while its circuit is open"""
+
+
+class UpstreamBusyError(UpstreamError):
+    """Raised when the upstream's concurrency limit is exhausted"""
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open probe after reset_timeout"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may proceed"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """Shared HTTP client for one upstream service"""
+
+    def __init__(self, name, pool_size=16, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=2, backoff_base=0.2, backoff_cap=2.0, max_concurrency=16,
+                 acquire_timeout=1.0, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.pool_size = pool_size
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled requests.Session, created (and requests imported) on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def get_json(self, url, params=None):
+        """GET url and decode the JSON body, retrying transient failures"""
+        return self.request('GET', url, params=params).json()
+
+    def request(self, method, url, **kwargs):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise UpstreamBusyError(self.name, 'too many concurrent requests')
+        if not self.breaker.allow():
+            self._slots.release()
+            raise CircuitOpenError(self.name, 'circuit open, upstream marked unhealthy')
+        try:
+            response = self._request_with_retries(method, url, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+        self.breaker.record_success()
+        return response
+
+    def _request_with_retries(self, method, url, **kwargs):
+        import requests
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = type(e).__name__
+            if attempt >= self.max_retries:
+                raise UpstreamError(self.name, f"{error} after {attempt + 1} attempts")
+            # Full jitter: sleep uniformly in [0, min(cap, base * 2^attempt)]
+            time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+            attempt += 1
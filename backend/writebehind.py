@@ -0,0 +1,247 @@
+"""
+Write-Behind Persistence for Lookate API
+Batched, off-request-path inserts for append-only log rows
+
+Search and ChatMessage rows are enqueued by the request handlers and
+flushed by a background thread in multi-row INSERTs, when the batch
+size is reached or the flush interval elapses. Handlers still return
+row IDs immediately: IDs are pre-assigned from blocks reserved by
+IdAllocator (hi/lo allocation), so nothing waits for the database.
+
+Queue backends:
+- MemoryQueueBackend: per-process queue, drained on shutdown
+- RedisQueueBackend: shared list that survives worker restarts, so any
+  worker can flush what another enqueued (multi-worker setups)
+"""
+
+import atexit
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_queues = []
+
+
+class IdAllocator:
+    """Thread-safe hi/lo ID allocator backed by the id_allocation table
+
+    Each process reserves block_size IDs at a time with one atomic
+    UPDATE ... RETURNING, then hands them out from memory. ``get_engine``
+    is called on each reservation, so the allocator can be created before
+    an application context exists.
+    """
+
+    def __init__(self, get_engine, name, table, block_size=100):
+        self.get_engine = get_engine
+        self.name = name
+        self.table = table
+        self.block_size = block_size
+        self._next = 0
+        self._limit = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            # A block reserved before fork must not be shared by the worker processes
+            if self._next >= self._limit or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._limit = self._reserve()
+                self._next = self._limit - self.block_size
+            self._next += 1
+            return self._next - 1
+
+    def _reserve(self):
+        reserve = text(
+            'UPDATE id_allocation SET next_value = next_value + :size '
+            'WHERE name = :name RETURNING next_value'
+        )
+        for _ in range(2):
+            with self.get_engine().begin() as conn:
+                limit = conn.execute(reserve, {'size': self.block_size, 'name': self.name}).scalar()
+                if limit is not None:
+                    return limit
+                # First use: start above any row inserted before write-behind was enabled
+                start = conn.execute(text(f'SELECT COALESCE(MAX(id), 0) + 1 FROM "{self.table}"')).scalar()
+                try:
+                    with conn.begin_nested():
+                        conn.execute(
+                            text('INSERT INTO id_allocation (name, next_value) VALUES (:name, :value)'),
+                            {'name': self.name, 'value': start + self.block_size}
+                        )
+                    return start + self.block_size
+                except Exception:
+                    # Another process created the row first; reserve from it
+                    continue
+        raise RuntimeError(f"Could not reserve IDs for {self.name}")
+
+
+class MemoryQueueBackend:
+    """In-process queue; records not yet flushed are lost if the process crashes"""
+
+    def __init__(self):
+        self._records = collections.deque()
+        self._lock = threading.Lock()
+
+    def push(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def pop_batch(self, size):
+        with self._lock:
+            return [self._records.popleft() for _ in range(min(size, len(self._records)))]
+
+    def requeue(self, records):
+        with self._lock:
+            self._records.extendleft(reversed(records))
+
+    def __len__(self):
+        return len(self._records)
+
+
+class RedisQueueBackend:
+    """Redis list shared by every worker; records survive worker restarts"""
+
+    def __init__(self, client, key='lookate:writebehind'):
+        self.client = client
+        self.key = key
+
+    def push(self, record):
+        self.client.rpush(self.key, json.dumps(record))
+
+    def pop_batch(self, size):
+        raw = self.client.lpop(self.key, size) or []
+        return [json.loads(item) for item in raw]
+
+    def requeue(self, records):
+        if records:
+            self.client.lpush(self.key, *[json.dumps(record) for record in reversed(records)])
+
+    def __len__(self):
+        return self.client.llen(self.key)
+
+
+class WriteBehindQueue:
+    """Buffer JSON-serializable records and flush them in batches
+
+    ``flush(records)`` runs inside an application context and must write
+    the whole batch in one transaction. With ``synchronous`` every record
+    is flushed as soon as it is enqueued (tests, one-off scripts).
+    """
+
+    def __init__(self, app, flush, backend, batch_size=200, interval=0.5, synchronous=False):
+        self.app = app
+        self.flush = flush
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval
+        self.synchronous = synchronous
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _queues.append(self)
+
+    def enqueue(self, record):
+        self.backend.push(record)
+        if self.synchronous:
+            self.flush_pending()
+            return
+        self._ensure_thread()
+        if len(self.backend) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # Started lazily so a pre-fork import does not leave a dead thread in each worker
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='lookate-writebehind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush_pending()
+
+    def flush_pending(self):
+        """Flush everything currently queued; returns the number of records written"""
+        written = 0
+        while True:
+            records = self.backend.pop_batch(self.batch_size)
+            if not records:
+                return written
+            with self.app.app_context():
+                try:
+                    self.flush(records)
+                    written += len(records)
+                except Exception:
+                    logger.exception("Write-behind flush of %d records failed", len(records))
+                    written += self._flush_individually(records)
+                    return written
+
+    def _flush_individually(self, records):
+        """Isolate bad records so one poison row cannot block the queue"""
+        written = 0
+        failed = []
+        for record in records:
+            try:
+                self.flush([record])
+                written += 1
+            except Exception:
+                failed.append(record)
+        if failed and not written:
+            # Nothing could be written (database down): keep the batch for the next round
+            self.backend.requeue(failed)
+        elif failed:
+            logger.error("Dropping %d write-behind records that could not be written: %s",
+                         len(failed), failed)
+        return written
+
+    def shutdown(self, timeout=10.0):
+        """Stop the flusher and hand off remaining records
+
+        In-process records are written now. Records in Redis are left for
+        the surviving workers when they cannot be written before timeout.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        while len(self.backend) and time.monotonic() < deadline:
+            if not self.flush_pending():
+                break
+
+
+def create_queue_backend(redis_url=None, key='lookate:writebehind'):
+    """Use a shared Redis list when reachable, else an in-process queue"""
+    client = get_redis_client(redis_url)
+    if client is not None:
+        return RedisQueueBackend(client, key=key)
+    return MemoryQueueBackend()
+
+
+def shutdown_all():
+    """Flush every write-behind queue in this process (gunicorn worker_exit / atexit)"""
+    for queue in _queues:
+        try:
+            queue.shutdown()
+        except Exception:
+            logger.exception("Write-behind shutdown failed")
+
+
+atexit.register(shutdown_all)
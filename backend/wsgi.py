@@ -0,0 +1,17 @@
+"""
+WSGI Entry Point for Lookate API
+Builds the application from FLASK_CONFIG and warms it up before workers fork
+
+gunicorn loads this module once in the master (preload_app in
+gunicorn.conf.py), so SDK imports, ORM setup and primed caches are
+shared copy-on-write by every worker.
+"""
+
+import os
+
+from app import create_app, warmup
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'default'))
+
+if os.environ.get('LOOKATE_WARMUP', 'true').lower() == 'true':
+    warmup(app)